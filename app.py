@@ -1,65 +1,64 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, Response, stream_with_context
 import sqlite3
-import requests
+import json
+import hmac
 import random
-import pickle
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
 from flask import jsonify
-from werkzeug.utils import secure_filename
+from werkzeug.http import is_resource_modified
 import os
-import requests
+from db import db
+from datasets import load as load_dataset
+from http_client import http_client
+from weather_provider import get_current_weather, weather_provider
+from climate_store import climate_store
+from price_store import price_store
+from forecast import forecast_prices
+from forecast_store import forecast_store
+from crop_suitability import CropSuitabilityIndex
+from model_registry import registry
+from farm_metrics import farm_metrics
+from fanout import gather
+from news_feed import news_feed
+from profiles import profiles, current_profile, login_user
+from crop_recommender import crop_recommender, features_from_csv, features_from_json, ModelUnavailable
+from bulk_import import import_users, import_crops, frame_from_csv, frame_from_json
+from crop_history import crop_history, decode_cursor, PAGE_SIZE as CROP_PAGE_SIZE, MAX_PAGE_SIZE
+from instrumentation import instrument_flask, metrics
+from page_cache import cached_page, page_cache
+from disease_pipeline import disease_pipeline, read_upload, InvalidImage, PipelineBusy, MAX_UPLOAD_BYTES
 
 app = Flask(__name__)
 app.secret_key = 'agri-secret'  # For session & flash messages
+# Werkzeug refuses larger request bodies with 413 before they are buffered; the image
+# limit plus room for multipart framing also covers the bulk CSV uploads
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 64 * 1024
+
+# Per-route latency and db/http/model/data/template breakdown, scraped from /metrics
+instrument_flask(app)
+
+# Create / upgrade the agri.db schema
+db.migrate()
+
+# Load the shared price store now, as fastapi_prices.py does: on a fresh agri.db this
+# seeds market_prices (and commodity_price_stats) from crop_price_dataset.csv
+price_store.snapshot()
+
+# Background news ingestion (set NEWS_WORKER=0 to run it elsewhere, e.g. python news_feed.py from cron)
+if os.environ.get('NEWS_WORKER', '1') == '1':
+    news_feed.start()
+
+
+# Rendered pages are cached until their data changes (or their TTL runs out)
+price_store.on_reload(lambda snapshot: page_cache.invalidate('prices'))
+news_feed.on_refresh(lambda: page_cache.invalidate('news'))
+profiles.on_invalidate(lambda user_id: page_cache.invalidate(None if user_id is None else f"profile:{user_id}"))
 
-# Initialize SQLite DB for users
-def init_db():
-    conn = sqlite3.connect('agri.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT NOT NULL UNIQUE,
-            password TEXT NOT NULL,
-            location TEXT,
-            soil_type TEXT,
-            land_size REAL,
-            water_source TEXT,
-            preferred_crops TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-# Initialize Crop Table
-def init_crop_table():
-    conn = sqlite3.connect('agri.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS current_crops (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            crop_name TEXT NOT NULL,
-            seeding_date TEXT NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-# First define the functions, then call them
-init_db()
-init_crop_table()
-
-
-# Load ML Models (only once)
-soil_model = pickle.load(open('ml_models/soil_health_model.pkl', 'rb'))
-revenue_model = pickle.load(open('ml_models/revenue_model.pkl', 'rb'))
 
 # Tamil Nadu Crop Dataset
-crop_df = pd.read_csv("crops_tamilnadu_fixed.csv")
+crop_df = load_dataset('tn_crops')
+crop_index = CropSuitabilityIndex(crop_df)
 
 # Home → Login Page
 @app.route('/')
@@ -93,14 +92,10 @@ def login():
     email = request.form['email']
     password = request.form['password']
 
-    conn = sqlite3.connect('agri.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email=? AND password=?", (email, password))
-    user = cursor.fetchone()
-    conn.close()
+    user = db.query_one("SELECT * FROM users WHERE email=? AND password=?", (email, password))
 
     if user:
-        session['user'] = user[1]  # Save user's name in session
+        login_user(user)  # Save user's id and name in session
         return redirect('/dashboard')
     else:
         flash("Invalid credentials!")
@@ -123,45 +118,26 @@ def register_user():
     water_source = request.form['water_source']
     preferred_crops = request.form['preferred_crops']
 
-    conn = sqlite3.connect('agri.db')
-    cursor = conn.cursor()
     try:
-        cursor.execute('''
+        db.execute('''
             INSERT INTO users (name, email, password, location, soil_type, land_size, water_source, preferred_crops)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (name, email, password, location, soil_type, land_size, water_source, preferred_crops))
-        conn.commit()
         flash("Registration successful! Please login.")
         return redirect('/')
     except sqlite3.IntegrityError:
         flash("Email already exists!")
         return redirect('/register')
-    finally:
-        conn.close()
 
 # Dashboard
 @app.route('/dashboard')
+@cached_page(ttl=60, per_user=True, check=current_profile)   # short TTL: also picks up retrained dashboard models
 def dashboard():
     if 'user' in session:
-        conn = sqlite3.connect('agri.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT soil_type, land_size FROM users WHERE name=?", (session['user'],))
-        result = cursor.fetchone()
-        conn.close()
-
-        if result:
-            soil_type, land_size = result
-            soil_inputs = [[6.5, 30, 150, 80, 60]]  # Dummy Inputs
-            soil_health = round(soil_model.predict(soil_inputs)[0], 2)
-            revenue_inputs = [[land_size, 5, soil_health, 2]]
-            monthly_revenue = round(revenue_model.predict(revenue_inputs)[0], 2)
-
-            farm_stats = {
-                'active_crops': 5,
-                'acres': land_size,
-                'soil_health': f"{soil_health}%",
-                'monthly_revenue': f"₹{monthly_revenue}K"
-            }
+        profile = current_profile()
+
+        if profile:
+            farm_stats = farm_metrics.farm_stats(profile['id'], profile['soil_type'], profile['land_size'])
 
             return render_template('dashboard.html', name=session['user'], farm_stats=farm_stats)
         else:
@@ -174,46 +150,19 @@ def dashboard():
 @app.route('/weather')
 def weather():
     if 'user' in session:
-        conn = sqlite3.connect('agri.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT location FROM users WHERE name=?", (session['user'],))
-        result = cursor.fetchone()
-        conn.close()
-
-        if result and result[0]:
-            lat, lon = map(float, result[0].split(','))
-            api_key = "63f6d64abf2532c74319740224e1fc24"
-            current_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-            current_weather = requests.get(current_url).json()
-
-            past_weather = []
-            if 'main' in current_weather:
-                current_temp = current_weather['main']['temp']
-                current_humidity = current_weather['main']['humidity']
-
-                for i in range(5):
-                    date = (datetime.now() - timedelta(days=i + 1)).strftime('%Y-%m-%d')
-                    temp = round(current_temp + random.uniform(-2, 2), 2)
-                    humidity = round(current_humidity + random.uniform(-5, 5), 2)
-                    humidity = max(0, min(100, humidity))
-                    past_weather.append({'date': date, 'temp': temp, 'humidity': humidity})
-
-            future_weather = []
-            months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            for month in months:
-                predicted_temp = round(current_temp + random.uniform(-3, 3), 2)
-                predicted_humidity = round(current_humidity + random.uniform(-10, 10), 2)
-                predicted_humidity = max(0, min(100, predicted_humidity))
-                future_weather.append({'Month': month, 'Predicted Temp': predicted_temp, 'Predicted Humidity': predicted_humidity})
-
-            annual_rainfall_data = []
-            annual_rainfall_total = 0
-            for month in months:
-                rainfall = round(random.uniform(50, 300), 2)
-                annual_rainfall_total += rainfall
-                annual_rainfall_data.append({'Month': month, 'Rainfall': rainfall})
-
-            annual_rainfall_total = round(annual_rainfall_total, 2)
+        profile = current_profile()
+
+        if profile and profile['location']:
+            lat, lon = map(float, profile['location'].split(','))
+            current_weather = get_current_weather(lat, lon)
+
+            # History, monthly outlook and rainfall come from the local climate store
+            past_weather = climate_store.history(lat, lon, days=5)
+            monthly = climate_store.monthly(lat, lon)
+            future_weather = [{'Month': m['month'], 'Normal Temp': m['temp'], 'Normal Humidity': m['humidity']}
+                              for m in monthly]
+            annual_rainfall_data = [{'Month': m['month'], 'Rainfall': m['rainfall']} for m in monthly]
+            annual_rainfall_total, rainfall_source = climate_store.annual_rainfall(lat, lon)
 
             return render_template('weather.html',
                                    name=session['user'],
@@ -221,7 +170,9 @@ def weather():
                                    past_weather=past_weather,
                                    future_weather=future_weather,
                                    annual_rainfall_data=annual_rainfall_data,
-                                   annual_rainfall_total=annual_rainfall_total)
+                                   annual_rainfall_total=annual_rainfall_total,
+                                   rainfall_source=rainfall_source,
+                                   climate_station=climate_store.station(lat, lon))
         else:
             return "Farm location not found in your profile."
     else:
@@ -229,49 +180,32 @@ def weather():
 
 # Tamil Nadu Crop Recommendation
 @app.route('/tncrop', methods=['GET', 'POST'])
+@cached_page(ttl=600, per_user=True, check=current_profile)
 def tn_crop():
     if 'user' not in session:
         return redirect('/')
 
-    conn = sqlite3.connect('agri.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT soil_type, location FROM users WHERE name=?", (session['user'],))
-    result = cursor.fetchone()
-    conn.close()
+    profile = current_profile()
 
-    if not result:
+    if not profile:
         flash("User profile incomplete!")
         return redirect('/dashboard')
 
-    soil_type, location = result
+    soil_type, location = profile['soil_type'], profile['location']
     lat, lon = map(float, location.split(','))
 
-    # Fetch current temperature
-    api_key = "63f6d64abf2532c74319740224e1fc24"
-    current_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-    current_weather = requests.get(current_url).json()
-    current_temp = current_weather['main']['temp'] if 'main' in current_weather else 28.0
-
-    # Simulate Annual Rainfall (can also re-use from weather page)
-    annual_rainfall = sum([round(random.uniform(50, 300), 2) for _ in range(12)])
+    # This month's normal temperature and the annual rainfall, both from the climate store,
+    # so the same farm gets the same recommendations on every visit
+    current_temp = climate_store.monthly_normal(lat, lon, datetime.now().month)['temp']
+    annual_rainfall, _ = climate_store.annual_rainfall(lat, lon)
 
     crops = []
     if request.method == 'POST':
         ph = float(request.form['ph'])
 
-        # Load your Tamil Nadu crop dataset
-        import pandas as pd
-        df = pd.read_csv("crops_tamilnadu_fixed.csv")
-
-        # Filter crops
-        filtered = df[
-            (df['MinTemp'] <= current_temp) & (df['MaxTemp'] >= current_temp) &
-            (df['MinPH'] <= ph) & (df['MaxPH'] >= ph) &
-            (df['MinRainfall'] <= annual_rainfall) & (df['MaxRainfall'] >= annual_rainfall) &
-            (df['SoilType'].str.lower().str.contains(soil_type.lower()))
-        ]
-
-        crops = filtered.to_dict(orient='records')
+        # Range lookups against the preloaded crop index
+        rows = crop_index.match(current_temp, ph, annual_rainfall, soil_type)
+        crops = crop_index.records(rows)
 
     return render_template('tncrop.html',
                            name=session['user'],
@@ -281,85 +215,103 @@ def tn_crop():
                            crops=crops)
 # Pest & Disease Guide Page
 @app.route('/pest')
+@cached_page(ttl=3600)
 def pest():
     return render_template('pest.html')
 
-# Dummy Model Prediction Function (Replace with real ML model later)
-def dummy_disease_detector(image_path):
-    # Example Dummy Logic
-    return "Powdery Mildew (Simulated Result)"
+DETECT_FORM_WAIT = 10   # seconds a plain form post waits for its job before answering
 
 @app.route('/detect_disease', methods=['POST'])
 def detect_disease():
-    if 'image' not in request.files:
+    # Queues the upload on the detection pipeline (dummy_disease_detector unless
+    # DISEASE_MODEL is set). JSON clients get 202 and a job id to poll; a plain form
+    # post waits for the result and renders it as before.
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    if 'image' not in request.files or request.files['image'].filename == '':
+        if wants_json:
+            return jsonify({'error': 'No image uploaded.'}), 400
         flash('No image uploaded!')
-        return redirect('/pest.html')
+        return redirect('/pest')
 
     image = request.files['image']
-    if image.filename == '':
-        flash('No selected image!')
-        return redirect('/pest.html')
-
-    filename = secure_filename(image.filename)
-    filepath = os.path.join("uploads", filename)
-    os.makedirs("uploads", exist_ok=True)
-    image.save(filepath)
-
-    # Dummy Disease Detection (Replace this with your actual ML model later)
-    disease_result = dummy_disease_detector(filepath)
-
-    # Remove image after detection (Optional)
-    os.remove(filepath)
-
-    # Render pest.html with result
-    return render_template('pest.html', disease_result=disease_result)
+    try:
+        job = disease_pipeline.submit(read_upload(image.stream), image.filename)
+    except InvalidImage as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        return render_template('pest.html', disease_result=f"Error: {e}")
+    except PipelineBusy as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+        return render_template('pest.html', disease_result=f"Error: {e}"), 503, {'Retry-After': '5'}
+
+    if wants_json:
+        return jsonify({'job_id': job.id, 'status': job.status,
+                        'status_url': url_for('disease_job', job_id=job.id)}), 202
+
+    if not job.done.wait(DETECT_FORM_WAIT):
+        return render_template('pest.html', disease_result=f"Still processing (job {job.id})")
+    return render_template('pest.html', disease_result=job.result or f"Error: {job.error}")
+
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    message = f"Upload is larger than {MAX_UPLOAD_BYTES // 2 ** 20} MB."
+    if request.accept_mimetypes.best == 'application/json' or request.path.startswith('/api/'):
+        return jsonify({'error': message}), 413
+    if request.endpoint == 'detect_disease':
+        return render_template('pest.html', disease_result=f"Error: {message}"), 413
+    return e
+
+
+@app.route('/api/disease_jobs/<job_id>')
+def disease_job(job_id):
+    job = disease_pipeline.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job.'}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/tips.html')
+@cached_page(ttl=3600)
 def tips():
     return render_template('tips.html')
 
 @app.route('/news.html')
+@cached_page(ttl=60, tags=('news',))
 def agri_news():
-    api_key = 'df10fb765da649de9702060cfed0500f'
-    url = (
-        f"https://newsapi.org/v2/everything?"
-        f"q=agriculture OR farming OR farmers OR agri OR irrigation OR soil&"
-        f"apiKey={api_key}&"
-        f"language=en&"
-        f"pageSize=15&"
-        f"sortBy=publishedAt"
-    )
+    # Rendered from the local store that the background news worker keeps fresh
+    articles, etag, last_modified = news_feed.latest(15)
+    if not articles:
+        # Nothing ingested yet (first start): fetch inline or wait for the worker's fetch
+        news_feed.ensure_articles()
+        articles, etag, last_modified = news_feed.latest(15)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+
+    response = make_response(render_template('news.html', articles=articles))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if not articles:
+        response.cache_control.no_store = True   # first-start page with no news yet: never cache
+    return response
 
-    try:
-        response = requests.get(url)
-        data = response.json()
-        articles = data.get('articles', [])
 
-        if not articles:
-            print("No articles fetched from API.")
-        else:
-            print(f"Fetched {len(articles)} articles.")
-            
-    except Exception as e:
-        articles = []
-        print("Error fetching news:", e)
-
-    return render_template('news.html', articles=articles)
 @app.route('/current_crop', methods=['GET', 'POST'])
 def current_crop():
     if 'user' not in session:
         return redirect('/')
 
-    conn = sqlite3.connect('agri.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, soil_type, location FROM users WHERE name=?", (session['user'],))
-    user_data = cursor.fetchone()
+    profile = current_profile()
 
-    if not user_data:
+    if not profile:
         flash("User data missing!")
         return redirect('/dashboard')
 
-    user_id, soil_type, location = user_data
+    user_id, soil_type, location = profile['id'], profile['soil_type'], profile['location']
 
     # Save crop data
     if request.method == 'POST':
@@ -367,28 +319,24 @@ def current_crop():
         seeding_date = request.form.get('seeding_date')
 
         if crop_name and seeding_date:
-            cursor.execute("INSERT INTO current_crops (user_id, crop_name, seeding_date) VALUES (?, ?, ?)",
-                           (user_id, crop_name, seeding_date))
-            conn.commit()
+            db.execute("INSERT INTO current_crops (user_id, crop_name, seeding_date) VALUES (?, ?, ?)",
+                       (user_id, crop_name, seeding_date))
             flash("Crop added successfully!")
             return redirect(url_for('current_crop'))
 
-    # Fetch all crops for user
-    cursor.execute("SELECT crop_name, seeding_date FROM current_crops WHERE user_id=? ORDER BY seeding_date DESC", (user_id,))
-    crops = cursor.fetchall()
+    # First page of the crop history; the page fetches the rest from /api/current_crops
+    crops, next_cursor = crop_history.page(user_id, CROP_PAGE_SIZE)
 
-    # Weather Info
+    # Weather Info, skipped if the upstream is slow
     lat, lon = map(float, location.split(','))
-    api_key = "63f6d64abf2532c74319740224e1fc24"
-    weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-    weather = requests.get(weather_url).json()
+    sources, _ = gather({'weather': lambda: get_current_weather(lat, lon)}, timeouts={'weather': 2.5},
+                        upstream=('weather',))
+    weather = sources['weather'] or {}
 
     current_temp = weather.get('main', {}).get('temp', '--')
     humidity = weather.get('main', {}).get('humidity', '--')
     weather_desc = weather.get('weather', [{}])[0].get('description', '--')
 
-    conn.close()
-
     # Dummy IoT Simulation (replace later)
     iot_humidity = round(random.uniform(20, 60), 1)
     water_recommendation = "Water the crops today." if iot_humidity < 30 else "No watering needed."
@@ -396,6 +344,7 @@ def current_crop():
     return render_template('current_crop.html',
                            name=session['user'],
                            crops=crops,
+                           next_cursor=next_cursor,
                            soil_type=soil_type,
                            current_temp=current_temp,
                            humidity=humidity,
@@ -404,74 +353,157 @@ def current_crop():
                            water_recommendation=water_recommendation)
 
 
+# A farmer's crop history, newest first, e.g. /api/current_crops?limit=50&cursor=...
+# JSON pages carry next_cursor; format=ndjson streams every row (or `limit` rows) from the cursor on.
+@app.route('/api/current_crops')
+def api_current_crops():
+    user_id = session.get('user_id')
+    if user_id is None:
+        return jsonify({'error': 'Not logged in.'}), 401
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return jsonify({'error': 'limit must be positive.'}), 400
+    try:
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if request.args.get('format') == 'ndjson':
+        def lines():
+            for crop, crop_cursor in crop_history.stream(user_id, cursor, limit):
+                yield json.dumps(dict(crop, cursor=crop_cursor)) + '\n'
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
+    crops, next_cursor = crop_history.page(user_id, min(limit or CROP_PAGE_SIZE, MAX_PAGE_SIZE), cursor)
+    return jsonify({'crops': crops, 'next_cursor': next_cursor})
+
+
 @app.route('/marketprice.html')
+@cached_page(ttl=300, tags=('prices',), check=price_store.snapshot)
 def market_price():
-    csv_path = "crop_price_dataset.csv"
-
     try:
-        df = pd.read_csv(csv_path)
-        print("✅ CSV Loaded:", df.shape)
+        prices = price_store.snapshot()
+        print("✅ Prices Loaded:", prices.rows)
     except Exception as e:
-        print("❌ Error reading CSV:", e)
-        return "Error reading CSV file."
+        print("❌ Error loading prices:", e)
+        return "Error loading price data.", 500
 
-    # Check required columns
-    if not {'month', 'commodity_name', 'avg_modal_price'}.issubset(df.columns):
-        print("❌ Missing required columns in CSV!")
-        return "CSV is missing required columns."
+    # Precomputed once per version of the dataset; a single indexed read per page view
+    results = forecast_store.results('marketprice', prices)
 
-    df['month'] = pd.to_datetime(df['month'], errors='coerce')
-    df = df.dropna(subset=['month'])
+    print("🟢 Total commodities processed:", len(results))
 
-    COMMODITIES = ["Tomato", "Potato", "Onion", "Jowar(Sorghum)", "Coconut", "Groundnut",
-                   "Turmeric", "Ginger (Dry)", "Barley", "Millets", "Sugarcane", "Coffee",
-                   "Cotton", "Sugar", "Rice", "Wheat", "Maize"]
+    return render_template('marketprice.html', results=results)
 
-    results = []
 
-    for commodity in COMMODITIES:
-        commodity_data = df[df['commodity_name'] == commodity].sort_values('month')
+# Batch price forecasts as JSON, e.g. /api/forecast?model=holt&horizon=12&commodity=Rice,Wheat
+@app.route('/api/forecast')
+def api_forecast():
+    commodities = [c for arg in request.args.getlist('commodity') for c in arg.split(',') if c] or None
+    try:
+        table = forecast_prices(price_store.snapshot(), commodities,
+                                model=request.args.get('model', 'naive'),
+                                horizon=min(request.args.get('horizon', 6, type=int), 36),
+                                window=min(request.args.get('window', 12, type=int), 240),
+                                as_of=request.args.get('as_of'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(table.to_dict())
+
+
+# Batch crop recommendation: JSON {"rows": [...], "k": 3} or a CSV upload/body with
+# N,P,K,temperature,humidity,ph,rainfall columns
+@app.route('/api/recommend', methods=['POST'])
+def api_recommend():
+    k = request.args.get('k', 3, type=int)
+    try:
+        if 'file' in request.files:
+            X = features_from_csv(request.files['file'].read().decode('utf-8'))
+        elif request.mimetype == 'text/csv':
+            X = features_from_csv(request.get_data(as_text=True))
+        else:
+            payload = request.get_json(silent=True)
+            if isinstance(payload, dict):
+                try:
+                    k = int(payload.get('k', k))
+                except (TypeError, ValueError):
+                    raise ValueError("k must be a positive integer.")
+                if k < 1:
+                    raise ValueError("k must be a positive integer.")
+            X = features_from_json(payload)
+        crops, probabilities = crop_recommender.recommend(X, k)
+    except ModelUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    results = [[{'crop': crop, 'probability': round(float(p), 4)} for crop, p in zip(row_crops, row_probs)]
+               for row_crops, row_probs in zip(crops.tolist(), probabilities)]
+    return jsonify({'k': crops.shape[1], 'results': results})
+
+
+# Bulk onboarding for cooperatives: JSON {"rows": [...]} or a CSV upload/body.
+# Needs the X-Import-Token header matching BULK_IMPORT_TOKEN; with no token configured
+# bulk imports are disabled. Crop rows may also be uploaded by a logged-in farmer, but
+# are then always filed under that farmer's own account.
+def bulk_upload(importer, allow_session=False):
+    token = os.environ.get('BULK_IMPORT_TOKEN')
+    header = request.headers.get('X-Import-Token')
+    if token and header is not None and hmac.compare_digest(header, token):
+        owner = None
+    elif allow_session and header is None and session.get('user_id') is not None:
+        owner = session['user_id']
+    else:
+        return jsonify({'error': 'Not authorized.'}), 403
+    try:
+        if 'file' in request.files:
+            frame = frame_from_csv(request.files['file'].read().decode('utf-8'))
+        elif request.mimetype == 'text/csv':
+            frame = frame_from_csv(request.get_data(as_text=True))
+        else:
+            frame = frame_from_json(request.get_json(silent=True))
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        return jsonify({'error': str(e)}), 400
+    result = importer(frame) if owner is None else importer(frame, owner=owner)
+    return jsonify(result)
 
-        if commodity_data.empty:
-            print(f"⚠️ No data for {commodity}")
-            continue
 
-        last_two = commodity_data.tail(2).dropna(subset=['avg_modal_price'])
+@app.route('/api/bulk/users', methods=['POST'])
+def api_bulk_users():
+    return bulk_upload(import_users)
 
-        try:
-            last_prices = last_two['avg_modal_price'].astype(float).values
-        except Exception as e:
-            print(f"⚠️ Error converting prices for {commodity}: {e}")
-            continue
 
-        if len(last_prices) < 2:
-            print(f"⚠️ Not enough data for {commodity}")
-            continue
+@app.route('/api/bulk/current_crops', methods=['POST'])
+def api_bulk_current_crops():
+    return bulk_upload(import_crops, allow_session=True)
 
-        last_two_months = last_two[['month', 'avg_modal_price']].copy()
-        last_two_months['month'] = last_two_months['month'].dt.strftime('%Y-%m')
 
-        slope = last_prices[-1] - last_prices[-2]
-        next_six = []
-        for i in range(1, 7):
-            future_month = (last_two['month'].max() + pd.DateOffset(months=i)).strftime('%Y-%m')
-            predicted = max(0, last_prices[-1] + i * slope)
-            next_six.append({
-                'month': future_month,
-                'predicted_price': round(predicted, 2)
-            })
+# Load time and memory per model
+@app.route('/api/models')
+def api_models():
+    return jsonify(registry.stats())
 
-        print(f"✅ {commodity} → Predicted")
 
-        results.append({
-            'commodity': commodity,
-            'last_two': last_two_months.to_dict(orient='records'),
-            'next_six': next_six
-        })
+# Per-host outbound call counters, circuit state and latency histograms
+@app.route('/api/upstream_stats')
+def api_upstream_stats():
+    return jsonify(http_client.stats())
 
-    print("🟢 Total commodities processed:", len(results))
 
-    return render_template('marketprice.html', results=results)
+# Prometheus scrape endpoint
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Hit/miss counters of the in-process caches
+@app.route('/api/cache_stats')
+def api_cache_stats():
+    return jsonify({'weather': weather_provider.stats(), 'farm_metrics': farm_metrics.stats(),
+                    'profiles': profiles.stats(), 'pages': page_cache.stats(),
+                    'disease_jobs': disease_pipeline.stats()})
 
 
 @app.route('/soilreport', methods=['GET', 'POST'])
@@ -512,6 +544,17 @@ def soil_report():
     return render_template('soilreport.html', soil_quality=soil_quality)
 
 
+# Per-source time budget (seconds) for the AI dashboard
+AI_DASHBOARD_TIMEOUTS = {'weather': 2.5, 'crop': 1.0, 'prices': 1.0}
+
+
+def latest_prices(commodities):
+    return [{'commodity_name': stats['commodity_name'],
+             'month': datetime.strptime(stats['latest_month'], '%Y-%m-%d').date(),
+             'avg_modal_price': stats['latest_price']}
+            for stats in price_store.commodity_stats(commodities)]
+
+
 # AI Powered Agri Dashboard
 @app.route('/ai_dashboard')
 def ai_dashboard():
@@ -519,22 +562,25 @@ def ai_dashboard():
         return redirect('/login')
 
     try:
-        conn = sqlite3.connect('agri.db')
-        cursor = conn.cursor()
-
         # Get user info
-        cursor.execute("SELECT id, soil_type, location FROM users WHERE name=?", (session['user'],))
-        user_info = cursor.fetchone()
-        if not user_info:
+        profile = current_profile()
+        if not profile:
             flash("User not found.")
             return redirect('/dashboard')
 
-        user_id, soil_type, location = user_info
+        user_id, soil_type, location = profile['id'], profile['soil_type'], profile['location']
 
-        # Weather
+        # Weather, current crop and market prices are fetched concurrently;
+        # a slow source is skipped instead of holding up the page
         lat, lon = map(float, location.split(','))
-        weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid=63f6d64abf2532c74319740224e1fc24&units=metric"
-        weather = requests.get(weather_url).json()
+        sources, unavailable = gather({
+            'weather': lambda: get_current_weather(lat, lon),
+            'crop': lambda: db.query_one("SELECT crop_name FROM current_crops WHERE user_id=? ORDER BY seeding_date DESC LIMIT 1", (user_id,)),
+            'prices': lambda: latest_prices(['Maize', 'Rice', 'Wheat']),
+        }, timeouts=AI_DASHBOARD_TIMEOUTS, upstream=('weather',))
+
+        # Weather
+        weather = sources['weather'] or {}
         temp = weather.get('main', {}).get('temp', '--')
         humidity = weather.get('main', {}).get('humidity', '--')
         weather_desc = weather.get('weather', [{}])[0].get('description', '--')
@@ -544,8 +590,7 @@ def ai_dashboard():
         irrigation_tip = "💧 Water crops today" if iot_humidity < 30 else "✅ No watering needed"
 
         # Check for current crops
-        cursor.execute("SELECT crop_name FROM current_crops WHERE user_id=? ORDER BY seeding_date DESC LIMIT 1", (user_id,))
-        crop_row = cursor.fetchone()
+        crop_row = sources['crop']
 
         if crop_row:
             crop_display = f"🌱 Current Crop: {crop_row[0]}"
@@ -553,15 +598,7 @@ def ai_dashboard():
             crop_display = "🌾 Recommended Crops: Rice, Wheat, Maize, Sugarcane"
 
         # Market Prices
-        df = pd.read_csv("crop_price_dataset.csv")
-        df['month'] = pd.to_datetime(df['month'], errors='coerce')
-        df.dropna(subset=['month'], inplace=True)
-
-        top_prices = df[df['commodity_name'].isin(['Rice', 'Wheat', 'Maize'])] \
-            .sort_values(['commodity_name', 'month']) \
-            .groupby('commodity_name').tail(1)
-
-        conn.close()
+        top_prices = sources['prices'] or []
 
         return render_template('ai_dashboard.html',
                                name=session['user'],
@@ -572,7 +609,8 @@ def ai_dashboard():
                                iot_humidity=iot_humidity,
                                irrigation_tip=irrigation_tip,
                                crop_display=crop_display,
-                               market_rates=top_prices)
+                               market_rates=top_prices,
+                               unavailable=unavailable)
 
     except Exception as e:
         print("Dashboard Error:", e)
@@ -580,12 +618,11 @@ def ai_dashboard():
         return redirect('/dashboard')
 
 
-    # Io
-
 # Logout
 @app.route('/logout')
 def logout():
     session.pop('user', None)
+    session.pop('user_id', None)
     return redirect('/')
 
 @app.template_filter('datetimeformat')
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# In-process load test for app.py and fastapi_prices.py against local upstream stubs:
+#   python benchmark.py --users 2000 --crops-per-user 20 --concurrency 8 --requests 200
+#   python benchmark.py --save-baseline      # record the current numbers
+#   python benchmark.py                      # compare against them, exit 1 on a regression
+
+BASELINE_PATH = os.environ.get('BENCH_BASELINE', 'bench_baseline.json')
+MIN_DELTA_MS = 2.0   # p95 changes smaller than this are timer noise, whatever the ratio
+
+# (app, method, path, form data)
+ROUTES = [
+    ('flask', 'GET', '/dashboard', None),
+    ('flask', 'GET', '/weather', None),
+    ('flask', 'POST', '/tncrop', {'ph': '6.5'}),
+    ('flask', 'GET', '/current_crop', None),
+    ('flask', 'GET', '/marketprice.html', None),
+    ('flask', 'GET', '/ai_dashboard', None),
+    ('fastapi', 'GET', '/', None),
+]
+SOIL_TYPES = ['Loamy', 'Sandy', 'Clay', 'Black', 'Red']
+CROPS = ['Rice', 'Wheat', 'Maize', 'Sugarcane', 'Cotton', 'Groundnut', 'Millets', 'Turmeric']
+
+
+class UpstreamStub(BaseHTTPRequestHandler):
+    # Answers OpenWeatherMap /weather and NewsAPI /everything after `delay` seconds
+    delay = 0.05
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        if urlsplit(self.path).path.endswith('/everything'):
+            payload = {'status': 'ok', 'articles': [
+                {'title': f"Farm news {i}", 'url': f"https://news.example/{i}", 'description': 'Stub article',
+                 'source': {'name': 'Stub'}, 'publishedAt': f"2025-07-{i + 1:02d}T06:00:00Z"} for i in range(15)]}
+        else:
+            payload = {'main': {'temp': 29.5, 'humidity': 64}, 'weather': [{'description': 'scattered clouds'}],
+                       'name': 'Stub'}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(delay):
+    UpstreamStub.delay = delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UpstreamStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def seed(users, crops_per_user, rng):
+    # Synthetic farmers around Tamil Nadu through the bulk import path
+    from bulk_import import import_users, import_crops
+    import pandas as pd
+
+    farmers = pd.DataFrame({
+        'name': [f"Farmer {i}" for i in range(users)],
+        'email': [f"farmer{i}@bench.local" for i in range(users)],
+        'password': 'bench',
+        'location': [f"{rng.uniform(8.1, 13.5):.4f},{rng.uniform(76.2, 80.3):.4f}" for _ in range(users)],
+        'soil_type': [rng.choice(SOIL_TYPES) for _ in range(users)],
+        'land_size': [round(rng.uniform(0.5, 25), 1) for _ in range(users)],
+        'water_source': 'Borewell',
+        'preferred_crops': 'Rice',
+    })
+    result = import_users(farmers)
+    crops = pd.DataFrame({
+        'email': [f"farmer{i}@bench.local" for i in range(users) for _ in range(crops_per_user)],
+        'crop_name': [rng.choice(CROPS) for _ in range(users * crops_per_user)],
+        'seeding_date': [f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                         for _ in range(users * crops_per_user)],
+    })
+    crop_result = import_crops(crops)
+    return result['inserted'], crop_result['inserted']
+
+
+def percentile(values, q):
+    import numpy as np
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else None
+
+
+def run_route(clients, route, requests, concurrency):
+    # `requests` calls split over `concurrency` threads, each with its own client/session
+    app_name, method, path, data = route
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def worker(client, count):
+        nonlocal errors
+        local, failed = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.open(path, method=method, data=data) if app_name == 'flask' \
+                else client.request(method, path, data=data)
+            local.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    shares = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, clients[:concurrency], shares))
+    elapsed = time.perf_counter() - started
+    return {'requests': len(latencies), 'errors': errors, 'seconds': round(elapsed, 3),
+            'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+            'p50_ms': percentile(latencies, 50), 'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99)}
+
+
+def compare(results, baseline, tolerance):
+    # A route regresses when p95 grows or throughput drops by more than `tolerance`,
+    # or when it starts failing requests it used to serve
+    problems = []
+    for name, now in results['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and now['p95_ms'] > max(before['p95_ms'] * (1 + tolerance), before['p95_ms'] + MIN_DELTA_MS):
+            problems.append(f"{name}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if before['rps'] and now['rps'] < before['rps'] * (1 - tolerance):
+            problems.append(f"{name}: throughput {before['rps']} -> {now['rps']} req/s")
+        if now['errors'] > before['errors']:
+            problems.append(f"{name}: errors {before['errors']} -> {now['errors']}")
+    return problems
+
+
+def broken_routes(results):
+    # Routes that failed every request: their timings measure an error page, not the route
+    return [name for name, r in results['routes'].items() if r['requests'] and r['errors'] == r['requests']]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Flask and FastAPI apps in-process.")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--crops-per-user', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="requests per route")
+    parser.add_argument('--upstream-delay', type=float, default=0.05, help="stub response time in seconds")
+    parser.add_argument('--routes', nargs='*', help="only these paths (e.g. /dashboard /)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--output', help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    # The seeded database lives only for the run
+    with tempfile.TemporaryDirectory(prefix='agri-bench-') as workdir:
+        return run(args, workdir)
+
+
+def run(args, workdir):
+    # Everything below must be configured before the app modules are imported
+    upstream = start_stub(args.upstream_delay)
+    os.environ.update({'AGRI_DB': os.path.join(workdir, 'agri.db'), 'NEWS_WORKER': '0',
+                       'OPENWEATHER_BASE_URL': upstream, 'NEWSAPI_BASE_URL': upstream})
+    from model_registry import resident_bytes
+    rss_start = resident_bytes()
+
+    import app as flask_app
+    from news_feed import news_feed
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    users, crops = seed(args.users, args.crops_per_user, rng)
+    news_feed.refresh()
+    print(f"Seeded {users} users and {crops} crops in {time.perf_counter() - started:.1f}s ({workdir})")
+
+    clients = {'flask': []}
+    for i in range(args.concurrency):
+        client = flask_app.app.test_client()
+        client.post('/login', data={'email': f"farmer{rng.randrange(users)}@bench.local", 'password': 'bench'})
+        clients['flask'].append(client)
+    try:
+        from fastapi.testclient import TestClient
+        import fastapi_prices
+        clients['fastapi'] = [TestClient(fastapi_prices.app, raise_server_exceptions=False)
+                              for _ in range(args.concurrency)]
+    except ImportError as e:
+        print("FastAPI routes skipped:", e)
+
+    results = {'config': {k: v for k, v in vars(args).items() if k not in ('baseline', 'save_baseline', 'output')},
+               'routes': {}}
+    for route in ROUTES:
+        app_name, method, path, _ = route
+        if app_name not in clients or (args.routes and path not in args.routes):
+            continue
+        name = f"{app_name} {method} {path}"
+        run_route(clients[app_name], route, args.concurrency, args.concurrency)   # warm caches and connections
+        results['routes'][name] = run_route(clients[app_name], route, args.requests, args.concurrency)
+
+    results['memory'] = {'rss_start_mb': round(rss_start / 2 ** 20, 1),
+                         'rss_end_mb': round(resident_bytes() / 2 ** 20, 1),
+                         'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+    print(f"{'route':<30} {'req':>5} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in results['routes'].items():
+        print(f"{name:<30} {r['requests']:>5} {r['errors']:>4} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+    memory = results['memory']
+    print(f"RSS {memory['rss_start_mb']} -> {memory['rss_end_mb']} MB (peak {memory['peak_rss_mb']} MB)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    broken = broken_routes(results)
+    for name in broken:
+        print(f"❌ {name}: every request failed")
+    if broken:
+        return 1
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return 0
+    with open(args.baseline) as f:
+        problems = compare(results, json.load(f), args.tolerance)
+    for problem in problems:
+        print("❌ Regression:", problem)
+    if not problems:
+        print(f"✅ Within {args.tolerance:.0%} of {args.baseline}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
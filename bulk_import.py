@@ -0,0 +1,158 @@
+import io
+import json
+import sqlite3
+import sys
+import pandas as pd
+from db import db
+
+USER_COLUMNS = ['name', 'email', 'password', 'location', 'soil_type', 'land_size', 'water_source', 'preferred_crops']
+CROP_COLUMNS = ['user_id', 'crop_name', 'seeding_date']
+SOIL_TYPES = ['Loamy', 'Sandy', 'Clay', 'Black', 'Red']   # same choices as the registration form
+CHUNK_SIZE = 500
+
+
+def frame_from_json(payload):
+    rows = payload.get('rows') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError("Expected a list of objects (or {\"rows\": [...]}).")
+    return pd.DataFrame(rows)
+
+
+def frame_from_csv(text):
+    return pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+
+
+def _text(df, column):
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[column].fillna('').astype(str).str.strip()
+
+
+class _Errors:
+    # Per-row error messages, collected with boolean masks
+    def __init__(self, index):
+        self.messages = {i: [] for i in range(len(index))}
+
+    def flag(self, mask, message):
+        for i in mask.to_numpy().nonzero()[0]:
+            self.messages[i].append(message)
+
+    def ok(self):
+        return pd.Series([not m for m in self.messages.values()])
+
+    def report(self):
+        # 1-based row numbers, counting data rows only
+        return [{'row': i + 1, 'errors': m} for i, m in self.messages.items() if m]
+
+
+def validate_users(df):
+    df = df.reset_index(drop=True)
+    errors = _Errors(df.index)
+    out = pd.DataFrame({c: _text(df, c) for c in USER_COLUMNS})
+
+    for column in ['name', 'email', 'password']:
+        errors.flag(out[column] == '', f"{column} is required")
+    errors.flag((out['email'] != '') & ~out['email'].str.contains('@', regex=False), "email is invalid")
+    lowered = out['email'].str.lower()
+    errors.flag((out['email'] != '') & lowered.duplicated(keep='first'), "email is repeated in this file")
+
+    parts = out['location'].str.split(',', n=1, expand=True).reindex(columns=[0, 1])
+    lat, lon = pd.to_numeric(parts[0], errors='coerce'), pd.to_numeric(parts[1], errors='coerce')
+    errors.flag(lat.isna() | lon.isna(), "location must be 'lat,lon'")
+    errors.flag(lat.notna() & lon.notna() & ~(lat.between(-90, 90) & lon.between(-180, 180)), "location is out of range")
+    out['location'] = lat.astype(str) + ',' + lon.astype(str)
+
+    soils = out['soil_type'].str.lower().map({s.lower(): s for s in SOIL_TYPES})
+    errors.flag(soils.isna(), f"soil_type must be one of {', '.join(SOIL_TYPES)}")
+    out['soil_type'] = soils
+
+    land = pd.to_numeric(out['land_size'], errors='coerce')
+    errors.flag(land.isna() | (land <= 0), "land_size must be a positive number")
+    out['land_size'] = land
+    return out, errors
+
+
+def validate_crops(df):
+    df = df.reset_index(drop=True)
+    errors = _Errors(df.index)
+    out = pd.DataFrame({'crop_name': _text(df, 'crop_name'), 'seeding_date': _text(df, 'seeding_date')})
+
+    # Farmers are referenced by user_id or by email
+    user_ids = pd.to_numeric(_text(df, 'user_id'), errors='coerce')
+    emails = _text(df, 'email').str.lower()
+    missing = user_ids.isna() & (emails != '')
+    if missing.any():
+        lookup = {}
+        wanted = emails[missing].unique().tolist()
+        for start in range(0, len(wanted), CHUNK_SIZE):
+            chunk = wanted[start:start + CHUNK_SIZE]
+            lookup.update(db.query(f"SELECT lower(email), id FROM users WHERE lower(email) IN ({','.join('?' * len(chunk))})", chunk))
+        user_ids = user_ids.fillna(emails.map(lookup))
+    known = set()
+    ids = user_ids.dropna().astype(int).unique().tolist()
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        known.update(r[0] for r in db.query(f"SELECT id FROM users WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+    errors.flag(user_ids.isna() | ~user_ids.isin(known), "unknown farmer (user_id or email)")
+    out['user_id'] = user_ids
+
+    errors.flag(out['crop_name'] == '', "crop_name is required")
+    dates = pd.to_datetime(out['seeding_date'], format='%Y-%m-%d', errors='coerce')
+    errors.flag(dates.isna(), "seeding_date must be YYYY-MM-DD")
+    out['seeding_date'] = dates.dt.strftime('%Y-%m-%d')
+    return out[CROP_COLUMNS], errors
+
+
+def _insert(sql, rows, positions, errors, chunk_size):
+    # executemany per chunk in one transaction; a chunk that hits a constraint is
+    # replayed row by row so only the offending rows are reported
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk, chunk_pos = rows[start:start + chunk_size], positions[start:start + chunk_size]
+        try:
+            with db.transaction() as conn:
+                conn.executemany(sql, chunk)
+            inserted += len(chunk)
+        except sqlite3.IntegrityError:
+            for row, pos in zip(chunk, chunk_pos):
+                try:
+                    db.execute(sql, row)
+                    inserted += 1
+                except sqlite3.IntegrityError as e:
+                    errors.messages[pos].append("email already exists" if 'email' in str(e) else str(e))
+    return inserted
+
+
+def import_users(df, chunk_size=CHUNK_SIZE):
+    out, errors = validate_users(df)
+    ok = errors.ok()
+    rows = [tuple(None if pd.isna(v) else v for v in r) for r in out[ok][USER_COLUMNS].itertuples(index=False)]
+    sql = f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' * len(USER_COLUMNS))})"
+    inserted = _insert(sql, rows, ok[ok].index.tolist(), errors, chunk_size)
+    return {'received': len(out), 'inserted': inserted, 'errors': errors.report()}
+
+
+def import_crops(df, chunk_size=CHUNK_SIZE, owner=None):
+    # With an owner every row is filed under that user, whatever user_id/email it names
+    if owner is not None:
+        df = df.drop(columns=['user_id', 'email'], errors='ignore').assign(user_id=str(owner))
+    out, errors = validate_crops(df)
+    ok = errors.ok()
+    rows = [(int(u), c, d) for u, c, d in out[ok].itertuples(index=False)]
+    sql = "INSERT INTO current_crops (user_id, crop_name, seeding_date) VALUES (?, ?, ?)"
+    inserted = _insert(sql, rows, ok[ok].index.tolist(), errors, chunk_size)
+    return {'received': len(out), 'inserted': inserted, 'errors': errors.report()}
+
+
+if __name__ == "__main__":
+    # python bulk_import.py users farmers.csv | python bulk_import.py crops crops.json
+    if len(sys.argv) != 3 or sys.argv[1] not in ('users', 'crops'):
+        sys.exit("usage: python bulk_import.py users|crops <file.csv|file.json>")
+    kind, path = sys.argv[1], sys.argv[2]
+    db.migrate()
+    with open(path, encoding='utf-8') as f:
+        frame = frame_from_json(json.load(f)) if path.endswith('.json') else frame_from_csv(f.read())
+    result = import_users(frame) if kind == 'users' else import_crops(frame)
+    for error in result['errors']:
+        print(f"Row {error['row']}: {'; '.join(error['errors'])}")
+    print(f"{result['inserted']} of {result['received']} {kind} imported.")
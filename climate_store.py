@@ -0,0 +1,212 @@
+import calendar
+import os
+import sys
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+import numpy as np
+from datasets import DATASETS, load
+from instrumentation import timed
+
+# Per-grid-cell climate data, answered from arrays with prefix sums:
+#   climate/monthly_normals.csv    station,lat,lon,month,temp_mean,humidity,rainfall_mm (bundled)
+#   climate/daily_observations.csv lat,lon,date,temp_mean,humidity,rainfall_mm (optional; drop in
+#                                  an IMD or Open-Meteo export to use observed history)
+# Days the observations don't cover are answered from the normals, so every lookup is
+# deterministic for a given location and date.
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+FIELDS = ['temp_mean', 'humidity', 'rainfall_mm']
+EARTH_RADIUS_KM = 6371.0
+COORD_PRECISION = 2          # lookups are cached on a ~1 km grid, as in weather_provider
+MIN_COVERAGE = 0.9           # share of days observations must cover before they replace normals
+MAX_OBSERVATION_KM = float(os.environ.get('CLIMATE_MAX_OBSERVATION_KM', 50))   # farther observations are not used
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(d):
+    return (d - EPOCH).days
+
+
+def nearest_cell(lats, lons, lat, lon):
+    # Equirectangular distance; plenty for picking the nearest of a few hundred cells
+    x = np.radians(lons - lon) * np.cos(np.radians(lat))
+    y = np.radians(lats - lat)
+    distances = np.hypot(x, y) * EARTH_RADIUS_KM
+    cell = int(np.argmin(distances))
+    return cell, float(distances[cell])
+
+
+class MonthlyNormals:
+    # values[cell, month, field]; prefix[cell, m, field] = sum over months < m
+    def __init__(self, df):
+        df = df.sort_values(['lat', 'lon', 'month'])
+        cells = df[['station', 'lat', 'lon']].drop_duplicates(['lat', 'lon'])
+        self.stations = cells['station'].astype(str).to_numpy()
+        self.lats = cells['lat'].to_numpy(dtype=np.float64)
+        self.lons = cells['lon'].to_numpy(dtype=np.float64)
+        cell_of = {(la, lo): i for i, (la, lo) in enumerate(zip(self.lats, self.lons))}
+
+        self.values = np.full((len(cells), 12, len(FIELDS)), np.nan)
+        rows = [cell_of[key] for key in zip(df['lat'], df['lon'])]
+        months = df['month'].to_numpy(dtype=np.intp) - 1
+        self.values[rows, months] = df[FIELDS].to_numpy(dtype=np.float64)
+        missing = np.isnan(self.values).any(axis=(1, 2))
+        if missing.any():
+            raise ValueError(f"Incomplete normals for: {', '.join(self.stations[missing])}")
+        self.prefix = np.concatenate([np.zeros((len(cells), 1, len(FIELDS))), self.values.cumsum(axis=1)], axis=1)
+
+    def total(self, cell, field, first_month=1, last_month=12):
+        # Sum of a field over an inclusive month range, e.g. the Oct-Dec monsoon
+        f = FIELDS.index(field)
+        if first_month <= last_month:
+            return self.prefix[cell, last_month, f] - self.prefix[cell, first_month - 1, f]
+        return self.prefix[cell, 12, f] - self.prefix[cell, first_month - 1, f] + self.prefix[cell, last_month, f]
+
+    def daily(self, cell, d):
+        # (temp, humidity, rainfall) normal for one day: temperature and humidity are
+        # interpolated between mid-month values, rainfall is the month's total spread evenly
+        days_in_month = calendar.monthrange(d.year, d.month)[1]
+        position = d.month - 1 + (d.day - 0.5) / days_in_month - 0.5
+        lower = int(np.floor(position)) % 12
+        weight = position - np.floor(position)
+        temp, humidity = (1 - weight) * self.values[cell, lower, :2] + weight * self.values[cell, (lower + 1) % 12, :2]
+        return float(temp), float(humidity), float(self.values[cell, d.month - 1, 2] / days_in_month)
+
+
+class DailyObservations:
+    # Rows sorted by (cell, day); prefix sums per field with NaNs counted as missing,
+    # so any window's total or mean is two searchsorted calls and two subtractions
+    def __init__(self, df):
+        df = df.dropna(subset=['lat', 'lon', 'date']).sort_values(['lat', 'lon', 'date'])
+        keys = df[['lat', 'lon']].to_numpy(dtype=np.float64)
+        starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+        self.lats, self.lons = keys[starts, 0], keys[starts, 1]
+        self.bounds = np.r_[starts, len(df)]
+        self.days = ((df['date'].to_numpy(dtype='datetime64[D]') - np.datetime64('1970-01-01', 'D'))
+                     .astype(np.int64))
+        values = df[FIELDS].to_numpy(dtype=np.float64)
+        self.values = values
+        self.prefix = np.vstack([np.zeros(len(FIELDS)), np.nan_to_num(values).cumsum(axis=0)])
+        self.counts = np.vstack([np.zeros(len(FIELDS), dtype=np.int64), (~np.isnan(values)).cumsum(axis=0)])
+
+    def window(self, cell, first, last):
+        # Row range of cell's observations with first <= day <= last
+        lo, hi = self.bounds[cell], self.bounds[cell + 1]
+        days = self.days[lo:hi]
+        return lo + int(np.searchsorted(days, first)), lo + int(np.searchsorted(days, last, side='right'))
+
+    def aggregate(self, cell, field, first, last):
+        # (sum, observed days) of a field over an inclusive day-number range
+        f = FIELDS.index(field)
+        i, j = self.window(cell, first, last)
+        return self.prefix[j, f] - self.prefix[i, f], int(self.counts[j, f] - self.counts[i, f])
+
+    def day(self, cell, d):
+        i, j = self.window(cell, day_number(d), day_number(d))
+        return self.values[i] if j > i else None
+
+
+class ClimateStore:
+    def __init__(self, normals_name='climate_normals', daily_name='climate_daily'):
+        self.normals_name = normals_name
+        self.daily_name = daily_name
+        self._normals = None
+        self._daily = None
+        self._lock = threading.Lock()
+        self._cells = lru_cache(maxsize=10000)(self._locate)
+
+    def load(self):
+        with self._lock:
+            if self._normals is None:
+                self._normals = MonthlyNormals(load(self.normals_name))
+                if os.path.exists(DATASETS[self.daily_name]['path']):
+                    self._daily = DailyObservations(load(self.daily_name))
+        return self._normals, self._daily
+
+    def _locate(self, lat, lon):
+        normals, daily = self.load()
+        cell, distance = nearest_cell(normals.lats, normals.lons, lat, lon)
+        daily_cell = None
+        if daily is not None and len(daily.lats):
+            nearest, daily_distance = nearest_cell(daily.lats, daily.lons, lat, lon)
+            daily_cell = nearest if daily_distance <= MAX_OBSERVATION_KM else None
+        return cell, distance, daily_cell
+
+    def locate(self, lat, lon):
+        # (normals cell, its distance in km, observations cell or None)
+        return self._cells(round(float(lat), COORD_PRECISION), round(float(lon), COORD_PRECISION))
+
+    def station(self, lat, lon):
+        cell, distance, _ = self.locate(lat, lon)
+        return {'station': self._normals.stations[cell], 'distance_km': round(distance, 1)}
+
+    def history(self, lat, lon, days=5, today=None):
+        # The `days` days before today, newest first: observed where available, else normal
+        today = today or date.today()
+        with timed('data'):
+            cell, _, daily_cell = self.locate(lat, lon)
+            history = []
+            for i in range(1, days + 1):
+                d = today - timedelta(days=i)
+                temp, humidity, _ = self._normals.daily(cell, d)
+                observed = self._daily.day(daily_cell, d) if daily_cell is not None else None
+                if observed is not None:
+                    temp = observed[0] if not np.isnan(observed[0]) else temp
+                    humidity = observed[1] if not np.isnan(observed[1]) else humidity
+                history.append({'date': d.strftime('%Y-%m-%d'), 'temp': round(float(temp), 2),
+                                'humidity': round(max(0.0, min(100.0, float(humidity))), 2)})
+            return history
+
+    def rolling_mean(self, lat, lon, field, days, today=None):
+        # Mean of a daily field over the `days` days before today
+        today = today or date.today()
+        with timed('data'):
+            cell, _, daily_cell = self.locate(lat, lon)
+            last = day_number(today) - 1
+            if daily_cell is not None:
+                total, observed = self._daily.aggregate(daily_cell, field, last - days + 1, last)
+                if observed >= MIN_COVERAGE * days:
+                    return round(float(total / observed), 2)
+            values = [self._normals.daily(cell, today - timedelta(days=i))[FIELDS.index(field)] for i in range(1, days + 1)]
+            return round(float(np.mean(values)), 2)
+
+    def monthly(self, lat, lon):
+        # Twelve months of normal temperature, humidity and rainfall
+        with timed('data'):
+            cell = self.locate(lat, lon)[0]
+            return [{'month': name, 'temp': round(float(v[0]), 2), 'humidity': round(float(v[1]), 2),
+                     'rainfall': round(float(v[2]), 2)} for name, v in zip(MONTHS, self._normals.values[cell])]
+
+    def monthly_normal(self, lat, lon, month):
+        cell = self.locate(lat, lon)[0]
+        temp, humidity, rainfall = self._normals.values[cell, month - 1]
+        return {'temp': round(float(temp), 2), 'humidity': round(float(humidity), 2), 'rainfall': round(float(rainfall), 2)}
+
+    def annual_rainfall(self, lat, lon, today=None):
+        # (mm, source): the last 365 days of observations when they cover the year,
+        # otherwise the sum of the monthly normals
+        today = today or date.today()
+        with timed('data'):
+            cell, _, daily_cell = self.locate(lat, lon)
+            if daily_cell is not None:
+                last = day_number(today) - 1
+                total, observed = self._daily.aggregate(daily_cell, 'rainfall_mm', last - 364, last)
+                if observed >= MIN_COVERAGE * 365:
+                    return round(float(total * 365 / observed), 2), 'observed'
+            return round(float(self._normals.total(cell, 'rainfall_mm')), 2), 'normal'
+
+
+climate_store = ClimateStore()
+
+
+if __name__ == "__main__":
+    # python climate_store.py LAT,LON — print what the weather and crop pages would show
+    lat, lon = map(float, (sys.argv[1] if len(sys.argv) > 1 else '11.0,78.0').split(','))
+    print(climate_store.station(lat, lon))
+    for day in climate_store.history(lat, lon):
+        print(day)
+    for month in climate_store.monthly(lat, lon):
+        print(month)
+    print("Annual rainfall:", climate_store.annual_rainfall(lat, lon))
+    print("30-day mean temperature:", climate_store.rolling_mean(lat, lon, 'temp_mean', 30))
@@ -0,0 +1,57 @@
+import base64
+from db import db
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH = 500
+
+
+def encode_cursor(seeding_date, crop_id):
+    return base64.urlsafe_b64encode(f"{seeding_date}|{crop_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        seeding_date, crop_id = raw.rsplit('|', 1)
+        return seeding_date, int(crop_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+class CropHistory:
+    # A farmer's plantings, newest first, paged with a keyset on (seeding_date, id).
+    # Each page is one range scan of idx_current_crops_user_seeding (the id rides along
+    # as the rowid), so page N costs the same as page 1 however long the history is.
+    def page(self, user_id, limit=PAGE_SIZE, cursor=None):
+        if cursor is None:
+            rows = db.query('''
+                SELECT id, crop_name, seeding_date FROM current_crops WHERE user_id=?
+                ORDER BY seeding_date DESC, id DESC LIMIT ?
+            ''', (user_id, limit))
+        else:
+            seeding_date, crop_id = decode_cursor(cursor)
+            rows = db.query('''
+                SELECT id, crop_name, seeding_date FROM current_crops
+                WHERE user_id=? AND (seeding_date, id) < (?, ?)
+                ORDER BY seeding_date DESC, id DESC LIMIT ?
+            ''', (user_id, seeding_date, crop_id, limit))
+        crops = [{'id': r[0], 'crop_name': r[1], 'seeding_date': r[2]} for r in rows]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0]) if len(rows) == limit else None
+        return crops, next_cursor
+
+    def stream(self, user_id, cursor=None, limit=None, batch=STREAM_BATCH):
+        # Yields (crop, cursor) pairs batch by batch; nothing but the current batch is held
+        while limit is None or limit > 0:
+            size = batch if limit is None else min(batch, limit)
+            crops, next_cursor = self.page(user_id, size, cursor)
+            for crop in crops:
+                yield crop, encode_cursor(crop['seeding_date'], crop['id'])
+            if next_cursor is None:
+                return
+            cursor = next_cursor
+            if limit is not None:
+                limit -= len(crops)
+
+
+crop_history = CropHistory()
@@ -0,0 +1,136 @@
+import io
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+import pandas as pd
+from instrumentation import timed
+from model_registry import registry
+
+# Column order used for training (training.MODEL_SPECS, Crop_recommendation.csv)
+FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+MAX_ROWS = 100000
+
+
+class ModelUnavailable(RuntimeError):
+    pass
+
+
+class MicroBatcher:
+    # Collects feature batches from concurrent requests for up to max_wait seconds
+    # (or max_batch rows) and scores them with a single model call. `combine` joins the
+    # submitted batches into the model's input; the result is split back by length.
+    def __init__(self, predict_fn, max_batch=4096, max_wait=0.005, combine=np.vstack):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.combine = combine
+        self.calls = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, X):
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put((X, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            try:
+                self.calls += 1
+                proba = self.predict_fn(self.combine([X for X, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for X, future in batch:
+                future.set_result(proba[start:start + len(X)])
+                start += len(X)
+
+
+class CropRecommender:
+    def __init__(self, model_name='crop', max_batch=4096, max_wait=0.005):
+        self.model_name = model_name
+        self.batcher = MicroBatcher(self.predict_proba, max_batch, max_wait)
+
+    def model(self):
+        try:
+            return registry.get(self.model_name)
+        except Exception as e:
+            print("Error loading crop model:", e)
+            raise ModelUnavailable("Crop model could not be loaded.")
+
+    def predict_proba(self, X):
+        # One vectorized call for the whole batch
+        return self.model().predict_proba(pd.DataFrame(X, columns=FEATURES))
+
+    def recommend(self, X, k=3):
+        with timed('model'):
+            classes = self.model().classes_
+            proba = self.batcher.submit(X).result()
+        k = max(1, min(k, len(classes)))
+        top = np.argsort(-proba, axis=1, kind='stable')[:, :k]
+        return classes[top], np.take_along_axis(proba, top, axis=1)
+
+
+def features_from_frame(df):
+    missing = [c for c in FEATURES if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+    X = df[FEATURES].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    return check_features(X)
+
+
+def features_from_json(payload):
+    # Accepts {"rows": [...]} or a bare list; rows are objects keyed by feature name
+    # or lists in FEATURES order
+    rows = payload.get('rows') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("Expected a non-empty list of feature rows.")
+    if all(isinstance(r, dict) for r in rows):
+        return features_from_frame(pd.DataFrame(rows))
+    try:
+        X = np.array(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Feature rows must be all objects or all numeric lists.")
+    if X.ndim != 2 or X.shape[1] != len(FEATURES):
+        raise ValueError(f"Each row needs {len(FEATURES)} values: {', '.join(FEATURES)}")
+    return check_features(X)
+
+
+def features_from_csv(text):
+    return features_from_frame(pd.read_csv(io.StringIO(text)))
+
+
+def check_features(X):
+    if len(X) > MAX_ROWS:
+        raise ValueError(f"At most {MAX_ROWS} rows per request.")
+    bad = np.flatnonzero(~np.isfinite(X).all(axis=1))
+    if len(bad):
+        raise ValueError(f"Invalid feature values in rows: {bad[:20].tolist()}")
+    return X
+
+
+crop_recommender = CropRecommender()
@@ -0,0 +1,111 @@
+from functools import lru_cache
+import numpy as np
+from instrumentation import timed
+
+EMPTY = np.empty(0, dtype=np.intp)
+
+
+class IntervalIndex:
+    # Static centered interval tree over [lo, hi] ranges.
+    # stab(x) returns the rows whose range contains x in O(log n + k);
+    # count(x) gives the exact number of matches in O(log n).
+    def __init__(self, lo, hi):
+        self.lo = np.asarray(lo, dtype=np.float64)
+        self.hi = np.asarray(hi, dtype=np.float64)
+        rows = np.flatnonzero(~np.isnan(self.lo) & ~np.isnan(self.hi))   # NaN bounds never match
+        self.size = len(rows)
+        self.lo_sorted = np.sort(self.lo[rows])
+        self.hi_sorted = np.sort(self.hi[rows])
+        self.nodes = []
+        self.root = self._build(rows)
+
+    def _build(self, rows):
+        if len(rows) == 0:
+            return -1
+        lo, hi = self.lo[rows], self.hi[rows]
+        center = np.median(np.concatenate([lo, hi]))
+        left, right = hi < center, lo > center
+        here = rows[~left & ~right]
+
+        # Ranges straddling the center, sorted by lower bound and by upper bound (descending)
+        by_lo = here[np.argsort(self.lo[here], kind='stable')]
+        by_hi = here[np.argsort(-self.hi[here], kind='stable')]
+
+        node = len(self.nodes)
+        self.nodes.append(None)
+        left_node = self._build(rows[left])
+        right_node = self._build(rows[right])
+        self.nodes[node] = (center, left_node, right_node, by_lo, self.lo[by_lo], by_hi, -self.hi[by_hi])
+        return node
+
+    def stab(self, x):
+        found = []
+        node = self.root
+        while node != -1:
+            center, left, right, by_lo, lo_vals, by_hi, neg_hi = self.nodes[node]
+            if x < center:
+                found.append(by_lo[:np.searchsorted(lo_vals, x, side='right')])
+                node = left
+            elif x > center:
+                found.append(by_hi[:np.searchsorted(neg_hi, -x, side='right')])
+                node = right
+            else:
+                found.append(by_lo)
+                break
+        return np.concatenate(found) if found else EMPTY
+
+    def count(self, x):
+        # lo > x and hi < x are disjoint for valid ranges, so the rest contain x
+        above = self.size - np.searchsorted(self.lo_sorted, x, side='right')
+        below = np.searchsorted(self.hi_sorted, x, side='left')
+        return self.size - above - below
+
+
+class CropSuitabilityIndex:
+    # Range-membership index over the Tamil Nadu crop catalogue
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.temp = IntervalIndex(df['MinTemp'], df['MaxTemp'])
+        self.ph = IntervalIndex(df['MinPH'], df['MaxPH'])
+        self.rainfall = IntervalIndex(df['MinRainfall'], df['MaxRainfall'])
+
+        # Soil types as categorical codes over their lower-cased names
+        soils = df['SoilType'].astype(object).fillna('').astype(str).str.lower().to_numpy()
+        self.soil_names, self.soil_codes = np.unique(soils, return_inverse=True)
+        self.soil_rows = [np.flatnonzero(self.soil_codes == code) for code in range(len(self.soil_names))]
+        self._soil_matches = lru_cache(maxsize=256)(self._matching_soil_codes)
+
+    def _matching_soil_codes(self, soil_type):
+        # Substring match ("loam" also matches "clay loam"), evaluated once per category
+        soil_type = soil_type.lower()
+        return np.array([code for code, name in enumerate(self.soil_names) if soil_type in name], dtype=np.intp)
+
+    def match(self, temp, ph, rainfall, soil_type):
+        with timed('data'):
+            codes = self._soil_matches(soil_type or '')
+            dims = [(self.temp, temp), (self.ph, ph), (self.rainfall, rainfall)]
+
+            # Start from the most selective condition, then filter the candidates on the rest
+            soil_count = sum(len(self.soil_rows[c]) for c in codes)
+            counts = [index.count(value) for index, value in dims]
+            best = int(np.argmin(counts))
+            if min(counts) == 0 or soil_count == 0:
+                return EMPTY
+            if soil_count < counts[best]:
+                rows = np.concatenate([self.soil_rows[c] for c in codes])
+            else:
+                index, value = dims.pop(best)
+                rows = index.stab(value)
+
+            keep = np.isin(self.soil_codes[rows], codes)
+            for index, value in dims:
+                keep &= (index.lo[rows] <= value) & (index.hi[rows] >= value)
+            return np.sort(rows[keep])
+
+    def match_many(self, queries):
+        # queries: iterable of (temp, ph, rainfall, soil_type); identical queries are answered once
+        answers = {}
+        return [answers[q] if q in answers else answers.setdefault(q, self.match(*q)) for q in map(tuple, queries)]
+
+    def records(self, rows):
+        return self.df.iloc[rows].to_dict(orient='records')
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Bundled CSVs and how their columns are typed in the columnar cache.
+# Text columns are always dictionary-encoded; the `categorical` ones come back as
+# pandas Categoricals, the rest as plain strings. The price CSV is not listed: its header
+# changes part-way through, so price_store reads it with price_ingest's column aliases.
+DATASETS = {
+    'tn_crops': {
+        'path': 'crops_tamilnadu_fixed.csv',
+        'categorical': ['SoilType'],
+    },
+    'crop_recommendation': {
+        'path': 'Crop_recommendation.csv',
+        'categorical': ['label'],
+    },
+    'soil_health': {'path': 'ml_models/soil_health_dataset.csv'},
+    'revenue': {'path': 'ml_models/revenue_dataset.csv'},
+    'climate_normals': {
+        'path': 'climate/monthly_normals.csv',
+        'categorical': ['station'],
+    },
+    # Optional: not bundled, read only when present
+    'climate_daily': {
+        'path': os.environ.get('CLIMATE_DAILY_CSV', 'climate/daily_observations.csv'),
+        'dates': ['date'],
+        'numeric': ['lat', 'lon', 'temp_mean', 'humidity', 'rainfall_mm'],
+    },
+}
+
+
+def source_version(path):
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def cache_dir(path):
+    # Crop_recommendation.csv -> Crop_recommendation.cols/
+    return os.path.splitext(path)[0] + '.cols'
+
+
+def parse_csv(path, categorical=(), dates=(), numeric=()):
+    df = pd.read_csv(path)
+    for col in dates:
+        if col in df:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in numeric:
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in categorical:
+        if col in df:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def build_cache(path, target, categorical=(), dates=(), numeric=()):
+    # Parse the CSV once and write one .npy per column plus meta.json
+    version = source_version(path)
+    df = parse_csv(path, dates=dates, numeric=numeric)
+    os.makedirs(target)
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        entry = {'name': col, 'file': f"{i}.npy"}
+        if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            codes, categories = pd.factorize(values, sort=True)   # NaN -> -1
+            values = codes.astype(np.int32)
+            entry['categories'] = categories.astype(str).tolist()
+            entry['categorical'] = col in categorical
+        else:
+            values = values.to_numpy()
+        np.save(os.path.join(target, entry['file']), values, allow_pickle=False)
+        columns.append(entry)
+    with open(os.path.join(target, 'meta.json'), 'w') as f:
+        json.dump({'source': os.path.basename(path), 'version': version, 'rows': len(df), 'columns': columns}, f)
+
+
+def load_cache(directory):
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    data = {}
+    for entry in meta['columns']:
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            dtype = pd.CategoricalDtype(entry['categories'])
+            values = pd.Categorical.from_codes(values, dtype=dtype)
+            if not entry['categorical']:
+                values = values.astype(object)
+        data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def cached_version(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_csv(path, categorical=(), dates=(), numeric=()):
+    # Typed DataFrame for a CSV, served from its memory-mapped column cache.
+    # The cache is rebuilt whenever the CSV's mtime or size changes.
+    target = cache_dir(path)
+    if cached_version(target) != source_version(path):
+        tmp_dir = f"{target}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        try:
+            build_cache(path, tmp_dir, categorical, dates, numeric)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(tmp_dir, target)
+        except OSError as e:
+            # Read-only checkout or a concurrent rebuild: parse directly this time
+            print(f"Could not write {target}:", e)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if cached_version(target) != source_version(path):
+                return parse_csv(path, categorical, dates, numeric)
+    return load_cache(target)
+
+
+def load(name):
+    spec = dict(DATASETS[name])
+    return load_csv(spec.pop('path'), **spec)
+
+
+if __name__ == "__main__":
+    # python datasets.py [name ...] — (re)build the column caches, e.g. at deploy time
+    for name in sys.argv[1:] or DATASETS:
+        if not os.path.exists(DATASETS[name]['path']):
+            print(f"{name}: {DATASETS[name]['path']} not found, skipped")
+            continue
+        started = time.perf_counter()
+        df = load(name)
+        print(f"{name}: {len(df)} rows, {len(df.columns)} columns in {time.perf_counter() - started:.3f}s")
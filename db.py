@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from instrumentation import timed
+
+DB_PATH = os.environ.get('AGRI_DB', 'agri.db')
+BUSY_TIMEOUT = float(os.environ.get('AGRI_DB_BUSY_TIMEOUT', 5))   # seconds to wait on a locked database
+STATEMENT_CACHE = 256                                             # prepared statements kept per connection
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# The first one matches the tables app.py and create_db.py used to create, so existing
+# databases upgrade in place.
+MIGRATIONS = [
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            password TEXT NOT NULL,
+            location TEXT,
+            soil_type TEXT,
+            land_size REAL,
+            water_source TEXT,
+            preferred_crops TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS current_crops (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            crop_name TEXT NOT NULL,
+            seeding_date TEXT NOT NULL,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        ''',
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS idx_users_name ON users(name)",
+        "CREATE INDEX IF NOT EXISTS idx_current_crops_user_seeding ON current_crops(user_id, seeding_date)",
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS price_forecasts (
+            dataset_hash TEXT NOT NULL,
+            view TEXT NOT NULL,
+            results TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (dataset_hash, view)
+        )
+        ''',
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS news_articles (
+            url TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            source TEXT,
+            author TEXT,
+            image_url TEXT,
+            published_at TEXT,
+            ingested_at TEXT NOT NULL
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_news_articles_published ON news_articles(published_at)",
+        '''
+        CREATE TABLE IF NOT EXISTS news_feed_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_fetch_at REAL NOT NULL DEFAULT 0
+        )
+        ''',
+        "INSERT OR IGNORE INTO news_feed_state (id, last_fetch_at) VALUES (1, 0)",
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS market_prices (
+            commodity_name TEXT NOT NULL,
+            state_name TEXT NOT NULL,
+            district_name TEXT NOT NULL,
+            month TEXT NOT NULL,
+            avg_modal_price REAL,
+            avg_min_price REAL,
+            avg_max_price REAL,
+            change REAL,
+            ingested_at TEXT NOT NULL,
+            PRIMARY KEY (commodity_name, state_name, district_name, month)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_market_prices_commodity_month ON market_prices(commodity_name, month)",
+        '''
+        CREATE TABLE IF NOT EXISTS commodity_price_stats (
+            commodity_name TEXT PRIMARY KEY,
+            latest_month TEXT,
+            latest_price REAL,
+            previous_month TEXT,
+            previous_price REAL,
+            change REAL,
+            updated_at TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS market_price_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        "INSERT OR IGNORE INTO market_price_state (id, version) VALUES (1, 0)",
+    ],
+]
+
+
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE)
+    conn.execute("PRAGMA journal_mode=WAL")      # readers no longer block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+    return conn
+
+
+class Database:
+    # One long-lived connection per thread (and per process, so forked workers
+    # never share a handle). sqlite3 reuses prepared statements per connection.
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def conn(self):
+        local = self._local
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            local.conn = connect(self.path)
+            local.pid = os.getpid()
+        return local.conn
+
+    def query(self, sql, params=()):
+        with timed('db'):
+            return self.conn().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with timed('db'):
+            return self.conn().execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        conn = self.conn()
+        with timed('db'), conn:
+            return conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        conn = self.conn()
+        with timed('db'), conn:
+            return conn.executemany(sql, rows)
+
+    @contextmanager
+    def transaction(self):
+        # Commits on success, rolls back on error
+        conn = self.conn()
+        with timed('db'), conn:
+            yield conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def migrate(self):
+        conn = self.conn()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            with conn:
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version={number}")
+        return len(MIGRATIONS)
+
+
+db = Database()
@@ -0,0 +1,184 @@
+import importlib
+import io
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from crop_recommender import MicroBatcher
+
+try:
+    from PIL import Image
+except ImportError:   # optional: without Pillow images reach the model undecoded
+    Image = None
+
+# Upload -> decode/resize in a thread pool -> micro-batched classifier -> job result.
+# Uploads never touch the filesystem; clients get a job id and poll for the result.
+# Jobs live in this process's memory, so with several workers the poll must reach the
+# worker that accepted the upload (sticky sessions), or results may be missing.
+
+MAX_UPLOAD_BYTES = int(os.environ.get('DISEASE_MAX_UPLOAD_BYTES', 10 * 2 ** 20))
+IMAGE_SIZE = (224, 224)
+DECODE_WORKERS = int(os.environ.get('DISEASE_DECODE_WORKERS', min(4, os.cpu_count() or 1)))
+MAX_QUEUE = int(os.environ.get('DISEASE_MAX_QUEUE', 64))     # unfinished jobs before uploads get a 503
+MAX_BATCH = int(os.environ.get('DISEASE_MAX_BATCH', 16))
+MAX_WAIT = float(os.environ.get('DISEASE_MAX_WAIT', 0.05))     # seconds a batch waits to fill up
+JOB_TTL = float(os.environ.get('DISEASE_JOB_TTL', 600))        # finished jobs are kept this long
+MAX_JOBS = 10000
+# A classifier is any callable taking a list of images (HxWx3 uint8 arrays, or raw bytes
+# without Pillow) and returning one label per image, e.g. DISEASE_MODEL=my_models:leaf_cnn
+DISEASE_MODEL = os.environ.get('DISEASE_MODEL', '')
+
+IMAGE_SIGNATURES = [b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a', b'BM']
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class PipelineBusy(RuntimeError):
+    pass
+
+
+# Dummy Model Prediction Function (Replace with real ML model later)
+def dummy_disease_detector(images):
+    return ["Powdery Mildew (Simulated Result)" for _ in images]
+
+
+def load_model(spec=DISEASE_MODEL):
+    if not spec:
+        return dummy_disease_detector
+    module, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module), attr or 'predict')
+
+
+def decode(data, size=IMAGE_SIZE):
+    if Image is None:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft('RGB', size)   # lets JPEG decode at a reduced scale
+            return np.asarray(image.convert('RGB').resize(size))
+    except Exception as e:
+        raise InvalidImage(f"Could not decode image: {e}")
+
+
+class Job:
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.done = threading.Event()
+
+    def finish(self, result=None, error=None):
+        self.status = 'failed' if error else 'done'
+        self.result = result
+        self.error = error
+        self.finished = time.time()
+        self.done.set()
+
+    def to_dict(self):
+        return {'job_id': self.id, 'status': self.status, 'filename': self.filename, 'result': self.result,
+                'error': self.error, 'created': self.created, 'finished': self.finished}
+
+
+class DiseasePipeline:
+    def __init__(self, model=None, decode_workers=DECODE_WORKERS, max_batch=MAX_BATCH, max_wait=MAX_WAIT,
+                 max_queue=MAX_QUEUE):
+        self.model = model or load_model()
+        self.decoder = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='disease-decode')
+        # The executor's own queue is unbounded; each unfinished job holds a slot, so a
+        # burst of uploads is refused instead of piling decoded images up in memory
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self.rejected = 0
+        self.batcher = MicroBatcher(self.predict, max_batch, max_wait,
+                                    combine=lambda parts: [image for part in parts for image in part])
+        self.jobs = OrderedDict()
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def predict(self, images):
+        labels = list(self.model(images))
+        if len(labels) != len(images):
+            raise RuntimeError(f"Model returned {len(labels)} labels for {len(images)} images.")
+        return labels
+
+    def submit(self, data, filename=''):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PipelineBusy("Too many images are waiting for detection, please retry shortly.")
+        job = Job(filename)
+        with self._lock:
+            self._prune()
+            self.jobs[job.id] = job
+        self.decoder.submit(self._run, job, data)
+        return job
+
+    def _run(self, job, data):
+        try:
+            job.status = 'decoding'
+            image = decode(data)
+            job.status = 'classifying'
+            future = self.batcher.submit([image])
+            future.add_done_callback(lambda f: self._finish(job, f))
+        except Exception as e:
+            self._fail(job, e)
+
+    def _finish(self, job, future):
+        error = future.exception()
+        if error is not None:
+            self._fail(job, error)
+            return
+        job.finish(result=future.result()[0])
+        self._slots.release()
+        with self._lock:
+            self.completed += 1
+
+    def _fail(self, job, error):
+        job.finish(error=str(error))
+        self._slots.release()
+        with self._lock:
+            self.failed += 1
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _prune(self):
+        # Oldest first: drop finished jobs past their TTL, and anything beyond MAX_JOBS
+        cutoff = time.time() - JOB_TTL
+        while self.jobs:
+            job = next(iter(self.jobs.values()))
+            if len(self.jobs) < MAX_JOBS and not (job.finished and job.finished < cutoff):
+                break
+            self.jobs.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            pending = sum(1 for job in self.jobs.values() if not job.done.is_set())
+            return {'jobs': len(self.jobs), 'pending': pending, 'completed': self.completed,
+                    'failed': self.failed, 'rejected': self.rejected, 'model_calls': self.batcher.calls, 'pillow': Image is not None}
+
+
+disease_pipeline = DiseasePipeline()
+
+
+def read_upload(stream, limit=MAX_UPLOAD_BYTES):
+    # The whole upload in memory, refusing anything over `limit`
+    data = stream.read(limit + 1)
+    if len(data) > limit:
+        raise InvalidImage(f"Image is larger than {limit // 2 ** 20} MB.")
+    if not data:
+        raise InvalidImage("Empty upload.")
+    # RIFF is only a container; WebP says so at offset 8
+    if not (any(data.startswith(sig) for sig in IMAGE_SIGNATURES) or (data[:4] == b'RIFF' and data[8:12] == b'WEBP')):
+        raise InvalidImage("Unsupported image format.")
+    return data
@@ -0,0 +1,87 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# Shared pool for per-request fan-out to independent data sources
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('FANOUT_WORKERS', 32)), thread_name_prefix='fanout')
+
+# Outbound HTTP sources get their own, smaller pool: a running call can't be cancelled, so
+# a slow upstream may keep these threads busy past the request's deadline, and it must not
+# starve the DB and price sources of the shared pool. When every slot is taken, new
+# upstream sources are reported unavailable at once instead of queueing behind them.
+UPSTREAM_WORKERS = int(os.environ.get('FANOUT_UPSTREAM_WORKERS', 8))
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='fanout-upstream')
+_upstream_slots = threading.BoundedSemaphore(UPSTREAM_WORKERS)
+
+# Deadline of the gather() a source runs under, for waits inside the source
+_deadline = contextvars.ContextVar('fanout_deadline', default=None)
+
+
+class Saturated(RuntimeError):
+    pass
+
+
+def remaining(default):
+    # Seconds a source may still block: `default`, capped by its gather() deadline
+    deadline = _deadline.get()
+    return default if deadline is None else max(0.0, min(default, deadline - time.monotonic()))
+
+
+def _run(deadline, fn):
+    _deadline.set(deadline)
+    return fn()
+
+
+def _run_upstream(deadline, fn):
+    try:
+        return _run(deadline, fn)
+    finally:
+        _upstream_slots.release()
+
+
+def submit(fn, deadline, upstream=False):
+    # Each source runs in a copy of the caller's context, so its DB/HTTP time is still
+    # attributed to the request
+    context = contextvars.copy_context()
+    if not upstream:
+        return executor.submit(context.run, _run, deadline, fn)
+    if not _upstream_slots.acquire(blocking=False):
+        raise Saturated("all upstream workers are busy")
+    try:
+        return upstream_executor.submit(context.run, _run_upstream, deadline, fn)
+    except Exception:
+        _upstream_slots.release()
+        raise
+
+
+def gather(sources, timeouts=None, default_timeout=2.0, upstream=()):
+    # Runs {name: callable} concurrently. Each source gets its own deadline measured from
+    # the start, so the total wait is the slowest source (capped by its timeout), not the sum.
+    # Sources named in `upstream` call external APIs and run on the upstream pool.
+    # Returns (results, unavailable): failed or late sources map to None and are listed.
+    started = time.monotonic()
+    results, unavailable, futures = {}, [], {}
+    for name, fn in sources.items():
+        timeout = (timeouts or {}).get(name, default_timeout)
+        try:
+            futures[name] = submit(fn, started + timeout, upstream=name in upstream)
+        except Saturated as e:
+            print(f"⚠️ {name} skipped: {e}")
+            results[name] = None
+            unavailable.append(name)
+    for name, future in futures.items():
+        timeout = (timeouts or {}).get(name, default_timeout)
+        try:
+            results[name] = future.result(timeout=max(0, started + timeout - time.monotonic()))
+        except TimeoutError:
+            future.cancel()
+            print(f"⚠️ {name} did not answer within {timeout}s")
+            results[name] = None
+            unavailable.append(name)
+        except Exception as e:
+            print(f"⚠️ {name} failed:", e)
+            results[name] = None
+            unavailable.append(name)
+    return {name: results[name] for name in sources}, unavailable
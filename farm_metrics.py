@@ -0,0 +1,55 @@
+from caching import LRUCache
+from instrumentation import timed
+from model_registry import registry
+
+DASHBOARD_MODELS = ['soil_health', 'revenue']
+
+
+def compute_farm_stats(land_size):
+    soil_inputs = [6.5, 30, 150, 80, 60]  # Dummy Inputs
+    with timed('model'):
+        soil_health = round(registry.compiled('soil_health').predict_one(soil_inputs), 2)
+        revenue_inputs = [land_size, 5, soil_health, 2]
+        monthly_revenue = round(registry.compiled('revenue').predict_one(revenue_inputs), 2)
+
+    return {
+        'active_crops': 5,
+        'acres': land_size,
+        'soil_health': f"{soil_health}%",
+        'monthly_revenue': f"₹{monthly_revenue}K"
+    }
+
+
+class FarmMetricsCache:
+    # Dashboard KPIs per user. An entry is only reused while the profile fields it was
+    # computed from and the model versions are unchanged, so edits to the user's row or
+    # a retrained model invalidate it on the next read.
+    def __init__(self, max_size=10000):
+        self.cache = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def farm_stats(self, user_key, soil_type, land_size):
+        fingerprint = (soil_type, land_size, tuple(registry.version(m) for m in DASHBOARD_MODELS))
+        entry = self.cache.get(user_key)
+        if entry is not None and entry[0] == fingerprint:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        for model in DASHBOARD_MODELS:
+            registry.refresh(model)
+        stats = compute_farm_stats(land_size)
+        self.cache.put(user_key, (fingerprint, stats))
+        return stats
+
+    def invalidate(self, user_key=None):
+        if user_key is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(user_key)
+
+    def stats(self):
+        return dict(self.cache.stats(), hits=self.hits, misses=self.misses)
+
+
+farm_metrics = FarmMetricsCache()
@@ -1,13 +1,18 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, Query, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-import pandas as pd
-from datetime import datetime
+from typing import List, Optional
 import logging
+from price_store import price_store
+from forecast import forecast_prices
+from forecast_store import forecast_store
+from instrumentation import instrument_fastapi, metrics, timed
+from page_cache import cached_endpoint, page_cache
 
 # Initialize FastAPI app
 app = FastAPI()
+instrument_fastapi(app)
 
 # Mount templates and static folders
 templates = Jinja2Templates(directory="templates")
@@ -16,84 +21,39 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Enable logging
 logging.basicConfig(level=logging.INFO)
 
-# Load dataset
-csv_path = "crop_price_dataset.csv"
-df = pd.read_csv(csv_path)
-
-# Ensure proper date parsing
-df['month'] = pd.to_datetime(df['month'], errors='coerce')
-df = df.dropna(subset=['month'])
-
-# List of commodities
-COMMODITIES = [
-    "Tomato", "Potato", "Onion",
-    "Jowar(Sorghum)", "Coconut", "Groundnut",
-    "Turmeric", "Ginger (Dry)", "Barley",
-    "Millets", "Sugarcane", "Coffee",
-    "Cotton", "Sugar", "Rice", "Wheat", "Maize"
-]
+# Shared, preloaded price store (reloads itself when new prices are ingested and
+# re-materializes the page forecasts)
+price_store.snapshot()
+price_store.on_reload(lambda snapshot: page_cache.invalidate('prices'))
 
 @app.get("/", response_class=HTMLResponse)
+@cached_endpoint(ttl=300, tags=('prices',), check=price_store.snapshot)
 async def read_root(request: Request):
-    results = []
-
-    for commodity in COMMODITIES:
-        commodity_data = df[df['commodity_name'] == commodity].sort_values('month')
-
-        if commodity_data.empty:
-            logging.info(f"No data for {commodity}")
-            continue
-
-        # Try to get June & July 2025
-        target_months = [
-            pd.Timestamp('2025-06-01'),
-            pd.Timestamp('2025-07-01')
-        ]
-        last_two = commodity_data[commodity_data['month'].isin(target_months)].sort_values('month')
-
-        # Fallback: use last 2 rows if needed
-        if len(last_two) < 2:
-            last_two = commodity_data.tail(2)
-
-        if len(last_two) < 2:
-            logging.info(f"Not enough rows for {commodity}")
-            continue
-
-        # Remove rows with missing price
-        last_two = last_two.dropna(subset=['avg_modal_price'])
-
-        try:
-            last_prices = last_two['avg_modal_price'].astype(float).values
-        except Exception as e:
-            logging.error(f"Error converting prices for {commodity}: {e}")
-            continue
-
-        if len(last_prices) < 2:
-            logging.info(f"Invalid last prices for {commodity}")
-            continue
+    # Anchored on June & July 2025 (falling back to each commodity's last two months),
+    # precomputed once per version of the dataset
+    results = forecast_store.results('marketprice_2025-07')
+
+    with timed('template'):
+        # markets.html is self-contained; index.html is Flask's login page (url_for, flashes)
+        return templates.TemplateResponse("markets.html", {
+            "request": request,
+            "results": results
+        })
 
-        # Format for display
-        last_two_months = last_two[['month', 'avg_modal_price']].copy()
-        last_two_months['month'] = last_two_months['month'].dt.strftime('%Y-%m')
 
-        # Predict next 6 months
-        slope = last_prices[-1] - last_prices[-2]
-        next_six = []
-        for i in range(1, 7):
-            future_month = (last_two['month'].max() + pd.DateOffset(months=i)).strftime('%Y-%m')
-            predicted = max(0, last_prices[-1] + i * slope)
-            next_six.append({
-                'month': future_month,
-                'predicted_price': round(predicted, 2)
-            })
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
 
-        results.append({
-            'commodity': commodity,
-            'last_two': last_two_months.to_dict(orient='records'),
-            'next_six': next_six
-        })
 
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "results": results
-    })
+@app.get("/api/forecast")
+async def api_forecast(commodity: Optional[List[str]] = Query(None), model: str = 'naive',
+                       horizon: int = Query(6, ge=1, le=36), window: int = Query(12, ge=2, le=240),
+                       as_of: Optional[str] = None):
+    commodities = [c for arg in commodity or [] for c in arg.split(',') if c] or None
+    try:
+        table = forecast_prices(price_store.snapshot(), commodities, model=model,
+                                horizon=horizon, window=window, as_of=as_of)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return table.to_dict()
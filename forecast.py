@@ -0,0 +1,145 @@
+import numpy as np
+from price_store import month_str
+
+# Forecasting models: fn(history, horizon, **params) -> (series, horizon) predictions.
+# history is a (series, window) matrix, oldest to newest, NaN-padded on the left.
+MODELS = {}
+MIN_POINTS = {}
+
+
+def register_model(name, min_points=1):
+    def wrap(fn):
+        MODELS[name] = fn
+        MIN_POINTS[name] = min_points
+        return fn
+    return wrap
+
+
+@register_model('naive', min_points=2)
+def naive_slope(history, horizon):
+    # Extend the last month-on-month change in a straight line
+    last, prev = history[:, -1], history[:, -2]
+    steps = np.arange(1, horizon + 1)
+    return last[:, None] + steps[None, :] * (last - prev)[:, None]
+
+
+@register_model('moving_average')
+def moving_average(history, horizon, window=3):
+    level = np.nanmean(history[:, -window:], axis=1)
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+@register_model('exp_smoothing')
+def exp_smoothing(history, horizon, alpha=0.5):
+    # Simple exponential smoothing, one vectorized step per month across every series
+    level = np.full(len(history), np.nan)
+    for col in history.T:
+        level = np.where(np.isnan(level), col, np.where(np.isnan(col), level, alpha * col + (1 - alpha) * level))
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+@register_model('holt', min_points=2)
+def holt(history, horizon, alpha=0.5, beta=0.3):
+    # Double exponential smoothing (level + trend)
+    level = np.full(len(history), np.nan)
+    trend = np.zeros(len(history))
+    for col in history.T:
+        seen = ~np.isnan(col)
+        first = seen & np.isnan(level)
+        new_level = alpha * col + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        update = seen & ~first
+        trend = np.where(update, new_trend, trend)
+        level = np.where(first, col, np.where(update, new_level, level))
+    steps = np.arange(1, horizon + 1)
+    return level[:, None] + steps[None, :] * trend[:, None]
+
+
+class ForecastTable:
+    # Compact result: one row per series, NumPy columns throughout
+    def __init__(self, keys, last_months, last_prices, months, predicted, model):
+        self.keys = keys                  # (n,) series keys (commodity)
+        self.last_months = last_months    # (n, 2) datetime64[M], last two actual months
+        self.last_prices = last_prices    # (n, 2) float64
+        self.months = months              # (n, horizon) datetime64[M]
+        self.predicted = predicted        # (n, horizon) float64, clipped at 0 and rounded
+        self.model = model
+
+    def __len__(self):
+        return len(self.keys)
+
+    def records(self):
+        # Same shape the market price templates have always used
+        results = []
+        for i, key in enumerate(self.keys):
+            results.append({
+                'commodity': str(key),
+                'last_two': [{'month': month_str(m), 'avg_modal_price': float(p)}
+                             for m, p in zip(self.last_months[i], self.last_prices[i]) if not np.isnan(p)],
+                'next_six': [{'month': month_str(m), 'predicted_price': float(p)}
+                             for m, p in zip(self.months[i], self.predicted[i])]
+            })
+        return results
+
+    def to_dict(self):
+        return {
+            'model': self.model,
+            'horizon': self.predicted.shape[1],
+            'commodities': [str(k) for k in self.keys],
+            'months': np.datetime_as_string(self.months, unit='M').tolist(),
+            'predicted': self.predicted.tolist(),
+            'last_months': np.datetime_as_string(self.last_months, unit='M').tolist(),
+            'last_prices': np.where(np.isnan(self.last_prices), None, self.last_prices).tolist(),
+        }
+
+
+def gather_history(prices, keys, window, column='avg_modal_price', as_of=None):
+    # Last `window` non-missing values per series as one right-aligned matrix
+    index = {k: i for i, k in enumerate(prices.keys)}
+    pos = np.array([index[k] for k in keys], dtype=np.intp)
+    starts, ends = prices.starts[pos], prices.ends[pos]
+
+    if as_of is not None:
+        # Rows are month-sorted within each series, so rows <= as_of form a prefix
+        upto = np.concatenate([[0], np.cumsum(prices.months <= np.datetime64(as_of, 'M'))])
+        ends = starts + (upto[ends] - upto[starts])
+
+    idx = ends[:, None] - window + np.arange(window)[None, :]
+    inside = idx >= starts[:, None]
+    idx = np.where(inside, idx, 0)
+    values = np.where(inside, prices.columns[column][idx], np.nan)
+    months = np.where(inside, prices.months[idx], np.datetime64('NaT', 'M'))
+
+    # Push missing prices to the left so the newest valid values line up in the last columns
+    order = np.argsort(~np.isnan(values), axis=1, kind='stable')
+    return np.take_along_axis(values, order, axis=1), np.take_along_axis(months, order, axis=1)
+
+
+def forecast_prices(prices, keys=None, model='naive', horizon=6, window=12, as_of=None, **params):
+    if model not in MODELS:
+        raise ValueError(f"Unknown forecast model: {model}")
+    keys = np.array([k for k in (prices.keys if keys is None else keys) if k in prices.offsets], dtype=object)
+    window = max(window, MIN_POINTS[model], 2)
+    if len(keys) == 0:
+        empty = np.empty((0, horizon))
+        return ForecastTable(keys, np.empty((0, 2), 'datetime64[M]'), np.empty((0, 2)),
+                             empty.astype('datetime64[M]'), empty, model)
+
+    values, months = gather_history(prices, keys, window, as_of=as_of)
+    enough = (~np.isnan(values)).sum(axis=1) >= MIN_POINTS[model]
+    keys, values, months = keys[enough], values[enough], months[enough]
+
+    predicted = np.round(np.maximum(0, MODELS[model](values, horizon, **params)), 2)
+    last_month = months[:, -1]
+    future = last_month[:, None] + np.arange(1, horizon + 1)[None, :]
+    return ForecastTable(keys, months[:, -2:], values[:, -2:], future, predicted, model)
+
+
+# Page-level forecasts, shared by the Flask market page and the FastAPI root
+def page_forecasts(prices, commodities, as_of=None, model='naive', horizon=6):
+    # Anchor on as_of when given, falling back to each commodity's latest months
+    forecasts = {r['commodity']: r for r in forecast_prices(prices, commodities, model, horizon, as_of=as_of).records()}
+    missing = [c for c in commodities if c not in forecasts]
+    if as_of is not None and missing:
+        forecasts.update({r['commodity']: r for r in forecast_prices(prices, missing, model, horizon).records()})
+    return [forecasts[c] for c in commodities if c in forecasts]
@@ -0,0 +1,62 @@
+import json
+import threading
+from datetime import datetime
+from db import db
+from instrumentation import timed
+from price_store import price_store, COMMODITIES
+from forecast import page_forecasts
+
+# Materialized views: name -> forecast parameters
+VIEWS = {
+    'marketprice': {'as_of': None},               # Flask /marketprice.html
+    'marketprice_2025-07': {'as_of': '2025-07'},  # FastAPI root, anchored on June & July 2025
+}
+
+
+class ForecastStore:
+    # Forecasts are pure functions of the price data, so they are computed once per
+    # dataset content hash and served from SQLite afterwards.
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def get(self, dataset_hash, view):
+        row = db.query_one("SELECT results FROM price_forecasts WHERE dataset_hash=? AND view=?",
+                           (dataset_hash, view))
+        return json.loads(row[0]) if row else None
+
+    def materialize(self, prices, views=None):
+        rows = []
+        for view in views or VIEWS:
+            results = page_forecasts(prices, COMMODITIES, **VIEWS[view])
+            rows.append((prices.content_hash, view, json.dumps(results), datetime.now().isoformat()))
+
+        with db.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO price_forecasts (dataset_hash, view, results, created_at) "
+                             "VALUES (?, ?, ?, ?)", rows)
+            # Forecasts for older versions of the dataset are never served again
+            conn.execute("DELETE FROM price_forecasts WHERE dataset_hash != ?", (prices.content_hash,))
+        return {view: json.loads(results) for _, view, results, _ in rows}
+
+    def results(self, view, prices=None):
+        prices = prices or price_store.snapshot()
+        with timed('data'):
+            results = self.get(prices.content_hash, view)
+            if results is None:
+                with self._lock:
+                    results = self.get(prices.content_hash, view)
+                    if results is None:
+                        results = self.materialize(prices, [view])[view]
+        return results
+
+
+db.migrate()
+forecast_store = ForecastStore()
+
+# Recompute whenever the ingested prices actually change
+price_store.on_reload(forecast_store.materialize)
+
+
+if __name__ == "__main__":
+    # Ingest step: python forecast_store.py
+    snap = price_store.snapshot()
+    print(f"Forecasts materialized for dataset {snap.content_hash[:12]} ({', '.join(VIEWS)})")
@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from caching import LRUCache
+from instrumentation import LatencyHistogram, histogram_lines, labels, metrics, timed
+
+# (connect, read) timeouts in seconds per upstream host
+HOST_TIMEOUTS = {
+    'api.openweathermap.org': (3.05, 5),
+    'newsapi.org': (3.05, 8),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class CircuitOpen(UpstreamError):
+    pass
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures; after `reset_after` seconds one trial
+    # request is let through (half-open) and its outcome closes or re-opens the circuit
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_after else 'open'
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class _HostStats:
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.fallbacks = 0
+
+
+class HttpClient:
+    # Shared keep-alive session for outbound API calls with per-host timeouts,
+    # bounded jittered retries and a circuit breaker that falls back to the last
+    # good response for the same request
+    def __init__(self, pool_size=32, retries=2, backoff=0.2, host_timeouts=HOST_TIMEOUTS):
+        self.retries = retries
+        self.backoff = backoff
+        self.host_timeouts = dict(host_timeouts)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.last_good = LRUCache(max_size=2048)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostStats()
+            return self._hosts[host]
+
+    def timeout_for(self, url):
+        return self.host_timeouts.get(urlsplit(url).hostname, DEFAULT_TIMEOUT)
+
+    def get_json(self, url, params=None, timeout=None, headers=None):
+        with timed('http'):
+            return self._get_json(url, params, timeout, headers)
+
+    def _get_json(self, url, params, timeout, headers):
+        host = urlsplit(url).netloc
+        stats = self._host(host)
+        key = (url, tuple(sorted((params or {}).items())))
+        timeout = timeout or self.timeout_for(url)
+
+        if not stats.breaker.allow():
+            return self._fallback(stats, key, CircuitOpen(f"Circuit open for {host}"))
+
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                stats.retries += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            started = time.perf_counter()
+            try:
+                stats.requests += 1
+                response = self.session.get(url, params=params, timeout=timeout, headers=headers)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise UpstreamError(f"{host} answered {response.status_code}")
+                data = response.json()
+            except (requests.RequestException, ValueError, UpstreamError) as e:
+                error = e
+                stats.failures += 1
+                continue
+            finally:
+                stats.latency.observe(time.perf_counter() - started)
+
+            stats.breaker.success()
+            if response.ok:
+                self.last_good.put(key, data)
+            # Other 4xx payloads (bad key, bad query) are returned as-is, like before
+            return data
+
+        stats.breaker.failure()
+        return self._fallback(stats, key, error)
+
+    def _fallback(self, stats, key, error):
+        data = self.last_good.get(key)
+        if data is None:
+            raise error if isinstance(error, UpstreamError) else UpstreamError(str(error))
+        stats.fallbacks += 1
+        return data
+
+    def stats(self):
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: {'requests': s.requests, 'failures': s.failures, 'retries': s.retries,
+                       'fallbacks': s.fallbacks, 'circuit': s.breaker.state,
+                       'latency_seconds': s.latency.snapshot()}
+                for host, s in hosts.items()}
+
+
+    def metric_lines(self):
+        stats = self.stats()
+        lines = ['# HELP agri_upstream_request_duration_seconds Outbound API call latency, per host.',
+                 '# TYPE agri_upstream_request_duration_seconds histogram']
+        for host, s in sorted(stats.items()):
+            lines += histogram_lines('agri_upstream_request_duration_seconds', s['latency_seconds'], host=host)
+        lines += ['# TYPE agri_upstream_fallbacks_total counter']
+        lines += [f"agri_upstream_fallbacks_total{labels(host=host)} {s['fallbacks']}" for host, s in sorted(stats.items())]
+        return lines
+
+
+http_client = HttpClient()
+metrics.collectors.append(http_client.metric_lines)
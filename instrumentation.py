@@ -0,0 +1,253 @@
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Where request time goes: every timed() block adds to one of these per request
+PHASES = ['db', 'http', 'model', 'data', 'template']
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Opt-in sampling profiler: PROFILE_SLOW_MS=200 dumps folded stacks for requests slower
+# than 200 ms into PROFILE_DIR (feed them to flamegraph.pl or speedscope)
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'slow_profiles')
+
+
+class LatencyHistogram:
+    # Cumulative-bucket histogram, Prometheus style
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.count += 1
+
+    def snapshot(self):
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + ['+Inf'], self.counts):
+            running += n
+            cumulative[str(bound)] = running
+        return {'buckets': cumulative, 'sum': round(self.total, 6), 'count': self.count}
+
+
+class RequestTimings:
+    # Per-request phase totals; shared by reference with fan-out worker threads
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.threads = {threading.get_ident()}
+        self.samples = Counter() if PROFILE_SLOW_MS else None
+        self.lock = threading.Lock()
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+_in_phase = contextvars.ContextVar('in_phase', default=False)
+
+
+@contextmanager
+def timed(phase):
+    # Adds the block's wall time to the current request's `phase`; free outside a request.
+    # Nested blocks count toward the outermost one only, so phases never add up twice.
+    timings = _current.get()
+    if timings is None or _in_phase.get():
+        yield
+        return
+    timings.threads.add(threading.get_ident())
+    token = _in_phase.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _in_phase.reset(token)
+        with timings.lock:
+            timings.phases[phase] += time.perf_counter() - started
+
+
+class Metrics:
+    def __init__(self):
+        self.requests = Counter()      # (app, route, method, status) -> count
+        self.latency = {}              # (app, route) -> LatencyHistogram
+        self.phases = Counter()        # (app, route, phase) -> seconds
+        self.collectors = []           # extra fn() -> lines of exposition text
+        self.active = set()
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def start(self):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        if timings.samples is not None:
+            with self._lock:
+                self.active.add(timings)
+            self._ensure_sampler()
+        return timings, token
+
+    def finish(self, timings, token, app, route, method, status):
+        elapsed = time.perf_counter() - timings.started
+        _current.reset(token)
+        with self._lock:
+            self.active.discard(timings)
+            self.requests[(app, route, method, str(status))] += 1
+            self.latency.setdefault((app, route), LatencyHistogram()).observe(elapsed)
+            for phase, seconds in timings.phases.items():
+                self.phases[(app, route, phase)] += seconds
+        if timings.samples and elapsed * 1000 >= PROFILE_SLOW_MS:
+            dump_profile(timings, app, route, elapsed)
+        return elapsed
+
+    def _ensure_sampler(self):
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True, name='request-sampler')
+                self._sampler.start()
+
+    def _sample(self):
+        # Every PROFILE_INTERVAL, record the stack of each thread working on an in-flight request
+        while True:
+            time.sleep(PROFILE_INTERVAL)
+            with self._lock:
+                active = list(self.active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for timings in active:
+                for ident in list(timings.threads):
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        timings.samples[folded_stack(frame)] += 1
+
+    def render(self):
+        # Prometheus text exposition format
+        with self._lock:
+            requests, phases = dict(self.requests), dict(self.phases)
+            latency = {key: hist.snapshot() for key, hist in self.latency.items()}
+        lines = ['# HELP agri_requests_total Requests handled, by route and status.',
+                 '# TYPE agri_requests_total counter']
+        for (app, route, method, status), n in sorted(requests.items()):
+            lines.append(f'agri_requests_total{labels(app=app, route=route, method=method, status=status)} {n}')
+        lines += ['# HELP agri_request_duration_seconds Request latency.',
+                  '# TYPE agri_request_duration_seconds histogram']
+        for (app, route), snap in sorted(latency.items()):
+            lines += histogram_lines('agri_request_duration_seconds', snap, app=app, route=route)
+        lines += ['# HELP agri_request_phase_seconds_total Time spent per phase (db, http, model, data, template).',
+                  '# TYPE agri_request_phase_seconds_total counter']
+        for (app, route, phase), seconds in sorted(phases.items()):
+            lines.append(f'agri_request_phase_seconds_total{labels(app=app, route=route, phase=phase)} {seconds:.6f}')
+        for collector in self.collectors:
+            try:
+                lines += collector()
+            except Exception as e:
+                print("Metrics collector failed:", e)
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in values.items()) + '}'
+
+
+def histogram_lines(name, snap, **label_values):
+    lines = [f'{name}_bucket{labels(**label_values, le=bound)} {count}' for bound, count in snap['buckets'].items()]
+    lines.append(f'{name}_sum{labels(**label_values)} {snap["sum"]}')
+    lines.append(f'{name}_count{labels(**label_values)} {snap["count"]}')
+    return lines
+
+
+def folded_stack(frame):
+    # "outermost;...;innermost" as in Brendan Gregg's folded format
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+def dump_profile(timings, app, route, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{app}{route}").strip('_') or app
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{int(elapsed * 1000)}ms-{name}.folded")
+    with open(path, 'w') as f:
+        for stack, count in timings.samples.most_common():
+            f.write(f"{stack} {count}\n")
+    print(f"Slow request {app} {route} ({elapsed * 1000:.0f} ms), profile written to {path}")
+
+
+metrics = Metrics()
+
+
+def instrument_flask(app, name='flask'):
+    from flask import g, request, template_rendered, before_render_template
+
+    @app.before_request
+    def _start_timing():
+        g._timings = metrics.start()
+
+    @app.after_request
+    def _record_timing(response):
+        timings = g.pop('_timings', None)
+        if timings is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.finish(*timings, name, route, request.method, response.status_code)
+        return response
+
+    @app.teardown_request
+    def _abandon_timing(error=None):
+        # Requests that raised past the error handlers never reach after_request
+        timings = g.pop('_timings', None)
+        if timings is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.finish(*timings, name, route, request.method, 500)
+
+    def _template_started(sender, template, context, **extra):
+        g.setdefault('_template_started', []).append(time.perf_counter())
+
+    def _template_finished(sender, template, context, **extra):
+        timings = _current.get()
+        if timings is not None and g.get('_template_started'):
+            seconds = time.perf_counter() - g._template_started.pop()
+            with timings.lock:
+                timings.phases['template'] += seconds
+
+    before_render_template.connect(_template_started, app, weak=False)
+    template_rendered.connect(_template_finished, app, weak=False)
+    return app
+
+
+def instrument_fastapi(app, name='fastapi'):
+    from starlette.routing import Match
+
+    def route_of(scope):
+        for route in app.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return 'unmatched'
+
+    @app.middleware('http')
+    async def _timing_middleware(request, call_next):
+        timings, token = metrics.start()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.finish(timings, token, name, route_of(request.scope), request.method, status)
+
+    return app
@@ -0,0 +1,150 @@
+import os
+import pickle
+import shutil
+import threading
+import time
+import joblib
+
+
+def resident_bytes():
+    # Current RSS of this process (Linux); 0 where /proc is unavailable
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def load_artifact(path):
+    # Legacy .pkl models are converted once to a .joblib sibling, which stores NumPy
+    # arrays raw so they can be memory-mapped instead of unpickled into private copies
+    if not path.endswith('.pkl'):
+        return joblib.load(path, mmap_mode='r')
+
+    fast_path = path[:-4] + '.joblib'
+    if os.path.exists(fast_path) and os.path.getmtime(fast_path) >= os.path.getmtime(path):
+        return joblib.load(fast_path, mmap_mode='r')
+
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+    try:
+        tmp_path = f"{fast_path}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, fast_path)
+    except OSError as e:
+        print(f"Could not write {fast_path}:", e)
+    return model
+
+
+class ModelRegistry:
+    # Models are loaded on first use (or all at once by preload() in a pre-fork master,
+    # so forked workers share the pages copy-on-write)
+    def __init__(self):
+        self._paths = {}
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path):
+        self._paths[name] = path
+
+    def path(self, name):
+        return self._paths[name]
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._load(name)
+        return model
+
+    def _load(self, name):
+        path = self._paths[name]
+        rss_before = resident_bytes()
+        started = time.perf_counter()
+        model = load_artifact(path)
+        self._stats[name] = {
+            'path': path,
+            'version': self.version(name),
+            'load_seconds': round(time.perf_counter() - started, 4),
+            'resident_bytes': max(0, resident_bytes() - rss_before),
+            'artifact_bytes': os.path.getsize(path),
+        }
+        self._models[name] = model
+        return model
+
+    def compiled(self, name):
+        # Flattened tree tables (see tree_inference), stored next to the artifact as
+        # <name>.forest/*.npy and memory-mapped
+        key = f"{name}:compiled"
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self._load_compiled(name, key)
+        return model
+
+    def _load_compiled(self, name, key):
+        from tree_inference import CompiledForest
+
+        path = self._paths[name]
+        table_dir = os.path.splitext(path)[0] + '.forest'
+        meta_path = os.path.join(table_dir, 'meta.json')
+        started = time.perf_counter()
+        if not (os.path.exists(meta_path) and os.path.getmtime(meta_path) >= os.path.getmtime(path)):
+            source = self._models.get(name) or self._load(name)
+            tmp_dir = f"{table_dir}.{os.getpid()}.tmp"
+            CompiledForest.from_sklearn(source).save(tmp_dir)
+            shutil.rmtree(table_dir, ignore_errors=True)
+            os.replace(tmp_dir, table_dir)
+
+        rss_before = resident_bytes()
+        model = CompiledForest.load(table_dir)
+        self._stats[key] = {
+            'path': table_dir,
+            'version': self.version(name),
+            'load_seconds': round(time.perf_counter() - started, 4),
+            'resident_bytes': max(0, resident_bytes() - rss_before),
+            'artifact_bytes': sum(os.path.getsize(os.path.join(table_dir, f)) for f in os.listdir(table_dir)),
+        }
+        self._models[key] = model
+        return model
+
+    def version(self, name):
+        # Changes whenever the artifact on disk is replaced (used to invalidate derived caches)
+        st = os.stat(self._paths[name])
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
+    def preload(self, names=None, compiled=False):
+        for name in names or self._paths:
+            try:
+                self.compiled(name) if compiled else self.get(name)
+            except Exception as e:
+                print(f"Error preloading model {name}:", e)
+
+    def refresh(self, name):
+        # Drop loaded copies whose artifact has been replaced on disk
+        loaded = self._stats.get(name) or self._stats.get(f"{name}:compiled")
+        if loaded and loaded['version'] != self.version(name):
+            self.unload(name)
+
+    def unload(self, name):
+        with self._lock:
+            self._models.pop(name, None)
+            self._models.pop(f"{name}:compiled", None)
+
+    def stats(self):
+        stats = {name: dict(self._stats.get(name, {'path': path}), loaded=name in self._models)
+                 for name, path in self._paths.items()}
+        stats.update({key: dict(info, loaded=key in self._models)
+                      for key, info in self._stats.items() if key.endswith(':compiled')})
+        return stats
+
+
+registry = ModelRegistry()
+registry.register('soil_health', os.environ.get('SOIL_MODEL_PATH', 'ml_models/soil_health_model.pkl'))
+registry.register('revenue', os.environ.get('REVENUE_MODEL_PATH', 'ml_models/revenue_model.pkl'))
+registry.register('crop', os.environ.get('CROP_MODEL_PATH', 'crop_model.pkl'))
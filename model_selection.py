@@ -0,0 +1,193 @@
+import itertools
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+from training import (ARTIFACT_DIR, MODEL_SPECS, SEED, frame, load_features, make_estimator,
+                      publish, save_artifact)
+
+FOLDS = 5
+LATENCY_RUNS = 200
+EARLY_STOP_TOL = 0.002      # stop adding trees once CV accuracy gains less than this
+ACCURACY_TOLERANCE = 0.005  # how much accuracy the chosen model may give up for size/speed
+
+# Per family: a grid of shape parameters. Forests are grown through `grow` tree counts
+# with warm starts; boosting stops on its own validation split.
+SEARCH_SPACE = {
+    'random_forest': {
+        'grid': {'max_depth': [None, 8, 12], 'min_samples_leaf': [1, 2, 4]},
+        'grow': [5, 10, 20, 40, 80, 160],
+    },
+    'extra_trees': {
+        'grid': {'max_depth': [None, 8, 12], 'min_samples_leaf': [1, 2, 4]},
+        'grow': [5, 10, 20, 40, 80, 160],
+    },
+    'hist_gradient_boosting': {
+        'grid': {'max_depth': [None, 3, 6], 'learning_rate': [0.1, 0.3]},
+        'fixed': {'max_iter': 300, 'early_stopping': True, 'n_iter_no_change': 10, 'validation_fraction': 0.1},
+    },
+}
+
+
+def configs(families=None):
+    for family in families or SEARCH_SPACE:
+        grid = SEARCH_SPACE[family]['grid']
+        for values in itertools.product(*grid.values()):
+            yield family, dict(zip(grid, values))
+
+
+def cross_validate(name, family, params, seed=SEED):
+    # Runs in a worker process. Returns one candidate per evaluated tree count (or one
+    # for boosting), each carrying its fold-0 model pickled for size/latency measurement.
+    spec = MODEL_SPECS[name]
+    X, y = load_features(name, spec)
+    folds = list(StratifiedKFold(FOLDS, shuffle=True, random_state=seed).split(X, y))
+    space = SEARCH_SPACE[family]
+    started = time.perf_counter()
+
+    def candidate(model, final_params, scores):
+        return {'family': family, 'params': final_params,
+                'accuracy': round(float(np.mean(scores)), 4), 'accuracy_std': round(float(np.std(scores)), 4),
+                'fit_seconds': round(time.perf_counter() - started, 3), 'model': pickle.dumps(model)}
+
+    if 'grow' not in space:
+        params = dict(space.get('fixed', {}), **params)
+        models, scores = [], []
+        for train, test in folds:
+            model = make_estimator(family, spec['kind'], params, seed).fit(frame(spec, X[train]), y[train])
+            scores.append(model.score(frame(spec, X[test]), y[test]))
+            models.append(model)
+        # Export with the number of iterations early stopping settled on
+        iterations = int(np.median([m.n_iter_ for m in models]))
+        final = dict(params, max_iter=iterations, early_stopping=False)
+        return [candidate(models[0], final, scores)]
+
+    models = [make_estimator(family, spec['kind'], dict(params, warm_start=True), seed, n_jobs=1) for _ in folds]
+    results, best = [], None
+    for n_estimators in space['grow']:
+        scores = []
+        for model, (train, test) in zip(models, folds):
+            model.set_params(n_estimators=n_estimators).fit(frame(spec, X[train]), y[train])
+            scores.append(model.score(frame(spec, X[test]), y[test]))
+        results.append(candidate(models[0], dict(params, n_estimators=n_estimators), scores))
+        accuracy = results[-1]['accuracy']
+        if best is not None and accuracy - best < EARLY_STOP_TOL:
+            break
+        best = accuracy if best is None else max(best, accuracy)
+    return results
+
+
+def single_row_latency(model, spec, X, runs=LATENCY_RUNS):
+    # Median wall time of one predict_proba on one row, the app's hot path
+    row = frame(spec, X[:1])
+    model.predict_proba(row)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1000, 4)
+
+
+def pareto_front(candidates):
+    # Candidates no other candidate beats on accuracy, latency and size at once
+    def dominates(a, b):
+        no_worse = (a['accuracy'] >= b['accuracy'] and a['latency_ms'] <= b['latency_ms']
+                    and a['size_bytes'] <= b['size_bytes'])
+        better = (a['accuracy'] > b['accuracy'] or a['latency_ms'] < b['latency_ms']
+                  or a['size_bytes'] < b['size_bytes'])
+        return no_worse and better
+    return [c for c in candidates if not any(dominates(o, c) for o in candidates)]
+
+
+def choose(front, tolerance=ACCURACY_TOLERANCE):
+    # Among front models within `tolerance` of the best accuracy, the one ranking best
+    # on latency and size together
+    best = max(c['accuracy'] for c in front)
+    eligible = [c for c in front if c['accuracy'] >= best - tolerance]
+    by_latency = sorted(eligible, key=lambda c: c['latency_ms'])
+    by_size = sorted(eligible, key=lambda c: c['size_bytes'])
+    return min(eligible, key=lambda c: (by_latency.index(c) + by_size.index(c), -c['accuracy']))
+
+
+def search(name='crop', families=None, workers=None, seed=SEED):
+    spec = MODEL_SPECS[name]
+    X, _ = load_features(name, spec)   # builds the feature cache once, before the workers start
+    started = time.perf_counter()
+    candidates = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(cross_validate, name, family, params, seed) for family, params in configs(families)]
+        for future in as_completed(futures):
+            for result in future.result():
+                # Latency is measured here, one model at a time, so workers don't skew it
+                blob = result.pop('model')
+                result['size_bytes'] = len(blob)
+                result['latency_ms'] = single_row_latency(pickle.loads(blob), spec, X)
+                candidates.append(result)
+    candidates.sort(key=lambda c: (-c['accuracy'], c['latency_ms']))
+    return candidates, round(time.perf_counter() - started, 3)
+
+
+def export(name, chosen, seed=SEED):
+    # Refit the chosen configuration on all rows, write a versioned artifact, publish it
+    # to the registry path and record it so later training.py runs keep these settings
+    spec = MODEL_SPECS[name]
+    X, y = load_features(name, spec)
+    params = {k: v for k, v in chosen['params'].items() if k != 'warm_start'}
+    model = make_estimator(chosen['family'], spec['kind'], params, seed)
+    model.fit(frame(spec, X), y)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=None)
+    meta = save_artifact(name, model, {
+        'family': chosen['family'],
+        'params': dict(params, random_state=seed),
+        'rows': len(X),
+        'evaluated_on': f"{FOLDS}-fold cv",
+        'metrics': {'accuracy': chosen['accuracy'], 'accuracy_std': chosen['accuracy_std'],
+                    'latency_ms': chosen['latency_ms']},
+    })
+    meta['published_to'] = publish(meta)
+    with open(os.path.join(ARTIFACT_DIR, name, 'selected.json'), 'w') as f:
+        json.dump({'family': chosen['family'], 'params': params, 'version': meta['version']}, f, indent=2)
+    return meta
+
+
+def print_front(front, chosen):
+    print(f"  {'family':<24} {'params':<58} {'accuracy':>8} {'latency ms':>10} {'size KB':>8}")
+    for c in sorted(front, key=lambda c: -c['accuracy']):
+        params = ', '.join(f"{k}={v}" for k, v in c['params'].items()
+                           if k not in SEARCH_SPACE[c['family']].get('fixed', {}) or k == 'max_iter')
+        print(f"{'*' if c is chosen else ' '} {c['family']:<24} {params:<58} {c['accuracy']:>8} "
+              f"{c['latency_ms']:>10} {c['size_bytes'] / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    # python model_selection.py [--workers N] [--tolerance 0.005] [--family random_forest ...] [--no-export]
+    args = sys.argv[1:]
+
+    def option(flag, default, cast=str, many=False):
+        values = [cast(args[i + 1]) for i, a in enumerate(args[:-1]) if a == flag]
+        return values if many else (values[-1] if values else default)
+
+    families = option('--family', None, many=True) or None
+    unknown = set(families or []) - set(SEARCH_SPACE)
+    if unknown:
+        sys.exit(f"Unknown families: {', '.join(sorted(unknown))} (choose from {', '.join(SEARCH_SPACE)})")
+    candidates, seconds = search('crop', families, option('--workers', None, int))
+    front = pareto_front(candidates)
+    chosen = choose(front, option('--tolerance', ACCURACY_TOLERANCE, float))
+
+    print(f"{len(candidates)} candidates in {seconds}s, {len(front)} on the Pareto front (* = chosen):")
+    print_front(front, chosen)
+    report = {'seconds': seconds, 'chosen': chosen, 'front': front, 'candidates': candidates}
+    if '--no-export' not in args:
+        meta = export('crop', chosen)
+        report['exported'] = {k: meta[k] for k in ('version', 'content_hash', 'artifact_bytes', 'published_to')}
+        print(f"Exported {meta['version']} ({meta['artifact_bytes'] / 1024:.0f} KB) to {meta['published_to']}")
+    os.makedirs(os.path.join(ARTIFACT_DIR, 'crop'), exist_ok=True)
+    with open(os.path.join(ARTIFACT_DIR, 'crop', 'selection.json'), 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from db import db
+from http_client import http_client
+
+NEWSAPI_BASE_URL = os.environ.get('NEWSAPI_BASE_URL', 'https://newsapi.org/v2')
+NEWSAPI_KEY = os.environ.get('NEWSAPI_KEY', 'df10fb765da649de9702060cfed0500f')
+NEWS_REFRESH_SECONDS = float(os.environ.get('NEWS_REFRESH_SECONDS', 900))
+NEWS_QUERY = {
+    'q': "agriculture OR farming OR farmers OR agri OR irrigation OR soil",
+    'language': 'en',
+    'pageSize': 15,
+    'sortBy': 'publishedAt',
+}
+KEEP_ARTICLES = 500
+
+
+def normalize(article, ingested_at):
+    # NewsAPI article -> row; articles without a URL or taken down upstream are dropped
+    url = (article.get('url') or '').strip()
+    title = (article.get('title') or '').strip()
+    if not url or not title or title == '[Removed]':
+        return None
+    return (url, title, article.get('description'), (article.get('source') or {}).get('name'),
+            article.get('author'), article.get('urlToImage'), article.get('publishedAt'), ingested_at)
+
+
+class NewsFeed:
+    def __init__(self, refresh_seconds=NEWS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._thread = None
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()   # one fetch at a time in this process
+        self._listeners = []
+
+    def claim(self):
+        # One fetch per interval across all worker processes sharing agri.db.
+        # Returns (previous, claimed) fetch times, or None when another process holds the interval.
+        now = time.time()
+        with db.transaction() as conn:
+            previous = conn.execute("SELECT last_fetch_at FROM news_feed_state WHERE id=1").fetchone()[0]
+            if previous > now - self.refresh_seconds:
+                return None
+            cursor = conn.execute("UPDATE news_feed_state SET last_fetch_at=? WHERE id=1 AND last_fetch_at=?",
+                                  (now, previous))
+        return (previous, now) if cursor.rowcount == 1 else None
+
+    def release(self, lease):
+        # Failed fetch: hand the interval back so the next check retries
+        previous, claimed = lease
+        db.execute("UPDATE news_feed_state SET last_fetch_at=? WHERE id=1 AND last_fetch_at=?", (previous, claimed))
+
+    def refresh(self):
+        data = http_client.get_json(f"{NEWSAPI_BASE_URL}/everything", params=dict(NEWS_QUERY, apiKey=NEWSAPI_KEY))
+        if data.get('status') == 'error':
+            raise RuntimeError(data.get('message') or data.get('code') or 'NewsAPI error')
+        ingested_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        rows = [row for row in (normalize(a, ingested_at) for a in data.get('articles', [])) if row]
+
+        with db.transaction() as conn:
+            # Dedup by URL: an article already stored keeps its original ingestion time
+            conn.executemany('''
+                INSERT INTO news_articles (url, title, description, source, author, image_url, published_at, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET title=excluded.title, description=excluded.description,
+                    image_url=excluded.image_url
+            ''', rows)
+            conn.execute('''
+                DELETE FROM news_articles WHERE url NOT IN
+                    (SELECT url FROM news_articles ORDER BY published_at DESC LIMIT ?)
+            ''', (KEEP_ARTICLES,))
+        print(f"Fetched {len(rows)} articles.")
+        for fn in self._listeners:
+            try:
+                fn()
+            except Exception as e:
+                print("News refresh hook failed:", e)
+        return len(rows)
+
+    def on_refresh(self, fn):
+        # fn() runs after every fetch that stored articles, e.g. to drop rendered pages
+        self._listeners.append(fn)
+        return fn
+
+    def refresh_if_due(self):
+        lease = self.claim()
+        if lease is None:
+            return
+        with self._fetch_lock:
+            try:
+                self.refresh()
+            except Exception as e:
+                print("Error fetching news:", e)
+                self.release(lease)
+
+    def ensure_articles(self):
+        # First start: nothing stored yet, so fetch inline regardless of the lease (or wait
+        # for the worker's fetch already in flight) rather than render an empty page
+        with self._fetch_lock:
+            if self.latest(1)[0]:
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                print("Error fetching news:", e)
+                return
+            db.execute("UPDATE news_feed_state SET last_fetch_at=? WHERE id=1", (time.time(),))
+
+    def _run(self):
+        while True:
+            self.refresh_if_due()
+            time.sleep(min(60, self.refresh_seconds))
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='news-feed')
+                self._thread.start()
+
+    def latest(self, limit=15):
+        # (articles, etag, last_modified) for the newest stored articles
+        rows = db.query('''
+            SELECT url, title, description, source, author, image_url, published_at, ingested_at
+            FROM news_articles ORDER BY published_at DESC LIMIT ?
+        ''', (limit,))
+        articles = [{'url': r[0], 'title': r[1], 'description': r[2], 'source': {'name': r[3]},
+                     'author': r[4], 'urlToImage': r[5], 'publishedAt': r[6]} for r in rows]
+        digest = hashlib.sha1()
+        for r in rows:
+            digest.update(f"{r[0]}|{r[1]}|{r[2]}\n".encode())
+        last_modified = max((r[7] for r in rows), default=None)
+        if last_modified:
+            last_modified = datetime.strptime(last_modified, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+        return articles, digest.hexdigest(), last_modified
+
+
+news_feed = NewsFeed()
+
+
+if __name__ == "__main__":
+    # One-off refresh, e.g. from cron: python news_feed.py
+    db.migrate()
+    news_feed.refresh()
@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from functools import wraps
+from caching import LRUCache
+
+try:
+    import brotli
+except ImportError:   # optional: without it only gzip bodies are stored
+    brotli = None
+
+# Rendered-page cache shared by app.py and fastapi_prices.py. Entries are keyed on the
+# route, the full path, the user (for per-user pages) and the generation of every data
+# tag the page depends on; invalidate(tag) bumps the generation, so all pages built from
+# the old data stop matching at once and age out of the LRU.
+
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE', '1') == '1'
+PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 2000))
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class CachedPage:
+    def __init__(self, body, content_type, etag=None, last_modified=None):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag or hashlib.sha1(body).hexdigest()
+        self.last_modified = last_modified   # HTTP date string, replayed as-is
+        self.created = time.monotonic()
+        self.encoded = {}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.encoded['gzip'] = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.encoded['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def respond(self, accept_encoding, if_none_match, if_modified_since=None, private=False):
+        # (status, headers, body) for a request with these headers. Each encoding is its own
+        # representation, so compressed bodies get their own ETag ("<etag>-gzip").
+        encoding = pick_encoding(accept_encoding, self.encoded)
+        etag = f"{self.etag}-{encoding}" if encoding else self.etag
+        headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding, Cookie' if private else 'Accept-Encoding',
+                   'Cache-Control': 'private, no-cache' if private else 'no-cache'}
+        if self.last_modified:
+            headers['Last-Modified'] = self.last_modified
+        if if_none_match:
+            tags = [t.strip().removeprefix('W/').strip('"') for t in if_none_match.split(',')]
+            if if_none_match.strip() == '*' or etag in tags:
+                return 304, headers, b''
+        elif if_modified_since and self.last_modified and not_modified_since(self.last_modified, if_modified_since):
+            return 304, headers, b''
+        headers['Content-Type'] = self.content_type
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return 200, headers, self.encoded[encoding] if encoding else self.body
+
+
+def not_modified_since(last_modified, if_modified_since):
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def pick_encoding(accept_encoding, available):
+    # Best of br/gzip the client accepts (q > 0) and we have a body for
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+class PageCache:
+    def __init__(self, max_size=PAGE_CACHE_SIZE, enabled=PAGE_CACHE_ENABLED):
+        self.enabled = enabled
+        self.cache = LRUCache(max_size)
+        self.generations = Counter()
+        self.expired = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def key(self, route, path, user=None, tags=()):
+        with self._lock:
+            return (route, path, user, tuple(self.generations[tag] for tag in tags))
+
+    def get(self, key, ttl):
+        entry = self.cache.get(key)
+        if entry is not None and time.monotonic() - entry.created >= ttl:
+            self.cache.pop(key)
+            self.expired += 1
+            return None
+        return entry
+
+    def put(self, key, body, content_type, etag=None, last_modified=None):
+        entry = CachedPage(body, content_type, etag, last_modified)
+        self.cache.put(key, entry)
+        return entry
+
+    def invalidate(self, tag=None):
+        # One tag ('prices', 'news', 'profile:<id>'), or everything
+        if tag is None:
+            self.cache.clear()
+        else:
+            with self._lock:
+                self.generations[tag] += 1
+
+    def stats(self):
+        return dict(self.cache.stats(), expired=self.expired, not_modified=self.not_modified,
+                    brotli=brotli is not None)
+
+
+page_cache = PageCache()
+
+
+def cached_page(ttl, tags=(), per_user=False, check=None):
+    # Flask view decorator: GET responses with status 200 are stored rendered and
+    # pre-compressed; per_user pages are keyed on the session's user_id (and the
+    # 'profile:<id>' tag) and bypass the cache for anonymous sessions. `check` runs
+    # before every lookup, e.g. a store's cheap version check that fires invalidations.
+    # Views opt a response out with Cache-Control: no-store.
+    from flask import make_response, request, session
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get('user_id') if per_user else None
+            if (not page_cache.enabled or request.method != 'GET' or '_flashes' in session
+                    or (per_user and user_id is None)):
+                return view(*args, **kwargs)
+
+            if check is not None:
+                check()
+            key_tags = tuple(tags) + ((f"profile:{user_id}",) if per_user else ())
+            key = page_cache.key(request.endpoint, request.full_path, user_id, key_tags)
+            entry = page_cache.get(key, ttl)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if (response.status_code != 200 or response.is_streamed or response.cache_control.no_store
+                        or '_flashes' in session):
+                    return response
+                entry = page_cache.put(key, response.get_data(), response.content_type, response.get_etag()[0],
+                                       response.headers.get('Last-Modified'))
+
+            status, headers, body = entry.respond(request.headers.get('Accept-Encoding'),
+                                                  request.headers.get('If-None-Match'),
+                                                  request.headers.get('If-Modified-Since'), private=per_user)
+            if status == 304:
+                page_cache.not_modified += 1
+            response = make_response(body, status)
+            response.headers.update(headers)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_endpoint(ttl, tags=(), check=None):
+    # The same for FastAPI endpoints that take the Request and return a rendered response
+    from starlette.responses import Response
+
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(request, *args, **kwargs):
+            if not page_cache.enabled or request.method != 'GET':
+                return await endpoint(request, *args, **kwargs)
+            if check is not None:
+                check()
+            path = request.url.path + (f"?{request.url.query}" if request.url.query else '')
+            key = page_cache.key(endpoint.__name__, path, None, tags)
+            entry = page_cache.get(key, ttl)
+            if entry is None:
+                response = await endpoint(request, *args, **kwargs)
+                if (response.status_code != 200 or not hasattr(response, 'body')
+                        or 'no-store' in response.headers.get('cache-control', '')):
+                    return response
+                entry = page_cache.put(key, response.body, response.headers.get('content-type', 'text/html'),
+                                       last_modified=response.headers.get('last-modified'))
+
+            status, headers, body = entry.respond(request.headers.get('accept-encoding'),
+                                                  request.headers.get('if-none-match'),
+                                                  request.headers.get('if-modified-since'))
+            if status == 304:
+                page_cache.not_modified += 1
+            return Response(body, status_code=status, headers=headers)
+        return wrapper
+    return decorator
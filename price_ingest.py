@@ -0,0 +1,143 @@
+import csv
+import json
+import sys
+from datetime import datetime, timezone
+from db import db
+
+PRICE_FIELDS = ['avg_modal_price', 'avg_min_price', 'avg_max_price', 'change']
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# Header names of the alternate export layout (crop_price_dataset.csv switches to it
+# halfway through); it labels the same two region levels country/state
+COLUMN_ALIASES = {
+    'max_price': 'avg_max_price',
+    'min_price': 'avg_min_price',
+    'modal_price': 'avg_modal_price',
+    'country': 'state_name',
+    'state': 'district_name',
+    'frequency': 'calculationType',
+}
+
+UPSERT = '''
+    INSERT INTO market_prices (commodity_name, state_name, district_name, month,
+                               avg_modal_price, avg_min_price, avg_max_price, change, ingested_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(commodity_name, state_name, district_name, month) DO UPDATE SET
+        avg_modal_price=excluded.avg_modal_price, avg_min_price=excluded.avg_min_price,
+        avg_max_price=excluded.avg_max_price, change=excluded.change, ingested_at=excluded.ingested_at
+    WHERE avg_modal_price IS NOT excluded.avg_modal_price OR avg_min_price IS NOT excluded.avg_min_price
+        OR avg_max_price IS NOT excluded.avg_max_price OR change IS NOT excluded.change
+'''
+
+
+def iter_csv(lines):
+    # Rows as dicts, streamed; a repeated header line switches the column layout
+    header = None
+    for values in csv.reader(lines):
+        if not values:
+            continue
+        if header is None or 'commodity_name' in values:
+            header = [COLUMN_ALIASES.get(name.strip(), name.strip()) for name in values]
+            continue
+        yield dict(zip(header, values))
+
+
+def iter_ndjson(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            row = json.loads(line)
+            yield {COLUMN_ALIASES.get(k, k): v for k, v in row.items()}
+
+
+def parse_month(value):
+    text = str(value or '').strip()[:10]
+    for fmt in ('%Y-%m-%d', '%Y-%m'):
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-01')
+        except ValueError:
+            pass
+    raise ValueError(f"month {value!r} is not YYYY-MM or YYYY-MM-DD")
+
+
+def to_float(value):
+    if value is None or str(value).strip().lower() in ('', 'nan', 'null'):
+        return None
+    return float(value)
+
+
+def normalize(row, ingested_at):
+    commodity = str(row.get('commodity_name') or '').strip()
+    if not commodity:
+        raise ValueError("commodity_name is required")
+    prices = [to_float(row.get(field)) for field in PRICE_FIELDS]
+    if prices[0] is None:
+        raise ValueError("avg_modal_price is required")
+    state = str(row.get('state_name') or '').strip() or 'India'
+    district = str(row.get('district_name') or '').strip() or 'All'
+    return (commodity, state, district, parse_month(row.get('month')), *prices, ingested_at)
+
+
+def refresh_stats(conn, commodities, updated_at):
+    # Latest and previous month per commodity (averaged over regions), one short
+    # index walk per affected commodity instead of a pass over the whole table
+    for commodity in commodities:
+        months = conn.execute('''
+            SELECT month, AVG(avg_modal_price) FROM market_prices WHERE commodity_name=?
+            GROUP BY month ORDER BY month DESC LIMIT 2
+        ''', (commodity,)).fetchall()
+        (latest_month, latest_price), previous = months[0], (months[1] if len(months) > 1 else (None, None))
+        change = latest_price - previous[1] if previous[1] is not None and latest_price is not None else None
+        conn.execute("INSERT OR REPLACE INTO commodity_price_stats VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (commodity, latest_month, latest_price, previous[0], previous[1], change, updated_at))
+
+
+def write_batch(batch, updated_at):
+    # Upsert one batch; unchanged rows are no-ops, so re-ingesting a file bumps nothing
+    with db.transaction() as conn:
+        before = conn.total_changes
+        conn.executemany(UPSERT, batch)
+        changed = conn.total_changes - before
+        if changed:
+            refresh_stats(conn, sorted({row[0] for row in batch}), updated_at)
+            conn.execute("UPDATE market_price_state SET version=version+1 WHERE id=1")
+    return changed
+
+
+def ingest(rows, batch_size=BATCH_SIZE):
+    ingested_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    result = {'rows': 0, 'changed': 0, 'skipped': 0, 'errors': []}
+    batch = []
+    for number, row in enumerate(rows, start=1):
+        result['rows'] += 1
+        try:
+            batch.append(normalize(row, ingested_at))
+        except (ValueError, TypeError) as e:
+            result['skipped'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append({'row': number, 'error': str(e)})
+        if len(batch) >= batch_size:
+            result['changed'] += write_batch(batch, ingested_at)
+            batch = []
+    if batch:
+        result['changed'] += write_batch(batch, ingested_at)
+    return result
+
+
+def ingest_file(path, batch_size=BATCH_SIZE):
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = iter_ndjson(f) if path.endswith(('.ndjson', '.jsonl')) else iter_csv(f)
+        return ingest(rows, batch_size)
+
+
+if __name__ == "__main__":
+    # python price_ingest.py new_prices.csv [more.ndjson ...]
+    if len(sys.argv) < 2:
+        sys.exit("usage: python price_ingest.py <prices.csv|prices.ndjson> ...")
+    db.migrate()
+    for path in sys.argv[1:]:
+        result = ingest_file(path)
+        for error in result['errors']:
+            print(f"{path} row {error['row']}: {error['error']}")
+        print(f"{path}: {result['rows']} rows read, {result['changed']} inserted or updated, {result['skipped']} skipped.")
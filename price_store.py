@@ -0,0 +1,162 @@
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from db import db
+from instrumentation import timed
+from price_ingest import ingest_file
+
+PRICE_CSV = os.environ.get('PRICE_CSV', 'crop_price_dataset.csv')
+PRICE_COLUMNS = ['avg_modal_price', 'avg_min_price', 'avg_max_price', 'change']
+STATS_COLUMNS = ['commodity_name', 'latest_month', 'latest_price', 'previous_month', 'previous_price',
+                 'change', 'updated_at']
+
+# Commodities shown on the market price pages
+COMMODITIES = ["Tomato", "Potato", "Onion", "Jowar(Sorghum)", "Coconut", "Groundnut",
+               "Turmeric", "Ginger (Dry)", "Barley", "Millets", "Sugarcane", "Coffee",
+               "Cotton", "Sugar", "Rice", "Wheat", "Maize"]
+
+
+class PriceSnapshot:
+    # Immutable view of one load of the price data: rows sorted by (commodity, month),
+    # each column a contiguous NumPy array, each commodity a [start, end) slice.
+    def __init__(self, df, version, content_hash=None):
+        df = df.sort_values(['commodity_name', 'month'], kind='mergesort').reset_index(drop=True)
+        names = df['commodity_name'].to_numpy()
+
+        self.version = version
+        self.rows = len(df)
+        self.months = df['month'].to_numpy().astype('datetime64[M]')
+        self.columns = {col: df[col].to_numpy(dtype=np.float64) for col in PRICE_COLUMNS}
+
+        commodities, starts = np.unique(names, return_index=True)
+        ends = np.append(starts[1:], len(names))
+        self.keys = commodities
+        self.starts = starts.astype(np.intp)
+        self.ends = ends.astype(np.intp)
+        self.offsets = {c: (int(s), int(e)) for c, s, e in zip(commodities, starts, ends)}
+        self.content_hash = content_hash or self.digest()
+
+    def digest(self):
+        # Hash of the data itself, so derived results are keyed on content, not on load order
+        digest = hashlib.sha256()
+        digest.update('\0'.join(self.keys).encode())
+        digest.update(self.starts.tobytes())
+        digest.update(self.months.astype(np.int64).tobytes())
+        for col in PRICE_COLUMNS:
+            digest.update(self.columns[col].tobytes())
+        return digest.hexdigest()
+
+    def commodities(self):
+        return list(self.offsets)
+
+    def series(self, commodity, n=None):
+        # Months and price columns for one commodity (last n rows if given), as array views
+        start, end = self.offsets.get(commodity, (0, 0))
+        if n is not None:
+            start = max(start, end - n)
+        data = {'month': self.months[start:end]}
+        for col, values in self.columns.items():
+            data[col] = values[start:end]
+        return data
+
+    def latest(self, commodity, n=2):
+        return self.series(commodity, n)
+
+    def at_months(self, commodity, months):
+        # Rows for the given months (e.g. ['2025-06', '2025-07']) via binary search on the sorted slice
+        start, end = self.offsets.get(commodity, (0, 0))
+        wanted = np.asarray(months, dtype='datetime64[M]')
+        lo = np.searchsorted(self.months[start:end], wanted, side='left')
+        hi = np.searchsorted(self.months[start:end], wanted, side='right')
+        idx = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)] or [[]]).astype(np.intp) + start
+        data = {'month': self.months[idx]}
+        for col, values in self.columns.items():
+            data[col] = values[idx]
+        return data
+
+
+def load_price_frame():
+    # One row per commodity and month (regions averaged) from the market_prices table
+    rows = db.query(f'''
+        SELECT commodity_name, month, {', '.join(f'AVG({col})' for col in PRICE_COLUMNS)}
+        FROM market_prices GROUP BY commodity_name, month
+    ''')
+    df = pd.DataFrame(rows, columns=['commodity_name', 'month'] + PRICE_COLUMNS)
+    df['month'] = pd.to_datetime(df['month'], format='%Y-%m-%d')
+    return df
+
+
+class PriceStore:
+    # Prices are ingested into SQLite by price_ingest; the bundled CSV only seeds an empty table
+    def __init__(self, seed_csv=PRICE_CSV, check_interval=2.0):
+        self.seed_csv = seed_csv
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def on_reload(self, fn):
+        # fn(snapshot) runs after every (re)load, e.g. to rebuild derived data
+        self._listeners.append(fn)
+        return fn
+
+    def version(self):
+        # Bumped by every ingestion batch that changes a row
+        return db.query_one("SELECT version FROM market_price_state WHERE id=1")[0]
+
+    def snapshot(self):
+        # Reload when the data version changes, checking at most once per check_interval
+        now = time.monotonic()
+        snap = self._snapshot
+        if snap is not None and now - self._checked_at < self.check_interval:
+            return snap
+        with self._lock, timed('data'):
+            snap = self._snapshot
+            self._checked_at = now
+            version = self.version()
+            if version == 0 and os.path.exists(self.seed_csv):
+                result = ingest_file(self.seed_csv)
+                print(f"Seeded market_prices from {self.seed_csv}: {result['changed']} rows")
+                version = self.version()
+            if snap is None or snap.version != version:
+                snap = PriceSnapshot(load_price_frame(), version)
+                self._snapshot = snap
+                self.reloads += 1
+                for fn in self._listeners:
+                    try:
+                        fn(snap)
+                    except Exception as e:
+                        print("Price reload hook failed:", e)
+        return snap
+
+    def commodities(self):
+        return self.snapshot().commodities()
+
+    def series(self, commodity, n=None):
+        return self.snapshot().series(commodity, n)
+
+    def latest(self, commodity, n=2):
+        return self.snapshot().latest(commodity, n)
+
+    def at_months(self, commodity, months):
+        return self.snapshot().at_months(commodity, months)
+
+    def commodity_stats(self, commodities):
+        # Incrementally maintained latest/previous month per commodity, in the order asked
+        rows = db.query(f"SELECT * FROM commodity_price_stats WHERE commodity_name IN ({','.join('?' * len(commodities))})",
+                        list(commodities))
+        stats = {r[0]: dict(zip(STATS_COLUMNS, r)) for r in rows}
+        return [stats[c] for c in commodities if c in stats]
+
+
+def month_str(month):
+    return np.datetime_as_string(month, unit='M')
+
+
+# Shared store used by app.py and fastapi_prices.py
+price_store = PriceStore()
@@ -0,0 +1,77 @@
+import os
+import time
+from flask import g, session
+from caching import LRUCache
+from db import db
+
+PROFILE_COLUMNS = ['id', 'name', 'email', 'location', 'soil_type', 'land_size', 'water_source', 'preferred_crops']
+PROFILE_TTL = float(os.environ.get('PROFILE_TTL', 30))   # seconds before a cached profile is re-read
+
+
+class ProfileStore:
+    # Farm profiles by user id, cached in-process. Other workers and scripts write the
+    # users table directly, so entries are re-read after `ttl` seconds; a re-read that
+    # finds the profile changed notifies the listeners like invalidate() does.
+    def __init__(self, max_size=10000, ttl=PROFILE_TTL):
+        self.cache = LRUCache(max_size)
+        self.ttl = ttl
+        self.reloads = 0
+        self._listeners = []
+
+    def get(self, user_id):
+        entry = self.cache.get(user_id)
+        if entry is not None and time.monotonic() < entry[1]:
+            return entry[0]
+        row = db.query_one(f"SELECT {', '.join(PROFILE_COLUMNS)} FROM users WHERE id=?", (user_id,))
+        profile = dict(zip(PROFILE_COLUMNS, row)) if row is not None else None
+        if profile is None:
+            self.cache.pop(user_id)
+        else:
+            self.cache.put(user_id, (profile, time.monotonic() + self.ttl))
+        if entry is not None:
+            self.reloads += 1
+            if entry[0] != profile:
+                self._notify(user_id)
+        return profile
+
+    def invalidate(self, user_id=None):
+        if user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(user_id)
+        self._notify(user_id)
+
+    def _notify(self, user_id):
+        for fn in self._listeners:
+            fn(user_id)
+
+    def on_invalidate(self, fn):
+        # fn(user_id) runs whenever a profile (or, with None, every profile) changes
+        self._listeners.append(fn)
+        return fn
+
+    def stats(self):
+        return dict(self.cache.stats(), ttl=self.ttl, reloads=self.reloads)
+
+
+profiles = ProfileStore()
+
+
+def login_user(user_row):
+    # user_row is a full `SELECT * FROM users` row
+    session['user_id'] = user_row[0]
+    session['user'] = user_row[1]   # display name, used by the templates
+
+
+def current_profile():
+    # The logged-in user's farm profile, loaded at most once per request
+    if 'profile' in g:
+        return g.profile
+    user_id = session.get('user_id')
+    if user_id is None and 'user' in session:
+        # Sessions created before the id was stored: resolve the name once
+        row = db.query_one("SELECT id FROM users WHERE name=?", (session['user'],))
+        if row:
+            user_id = session['user_id'] = row[0]
+    g.profile = profiles.get(user_id) if user_id is not None else None
+    return g.profile
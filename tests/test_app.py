@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_app(tmp_path, code):
+    # Runs `code` in a fresh interpreter with app.py imported against an empty agri.db,
+    # so startup runs exactly as it does on a new deployment; returns what it prints as JSON
+    env = dict(os.environ, AGRI_DB=str(tmp_path / 'agri.db'), NEWS_WORKER='0',
+               OPENWEATHER_BASE_URL='http://127.0.0.1:9', NEWSAPI_BASE_URL='http://127.0.0.1:9')
+    script = "import json\nimport app\nclient = app.app.test_client()\n" + textwrap.dedent(code)
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-c', script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_recommend_rejects_bad_k(tmp_path):
+    responses = run_app(tmp_path, """
+        features = {'N': 90, 'P': 42, 'K': 43, 'temperature': 21, 'humidity': 82, 'ph': 6.5, 'rainfall': 203}
+        out = []
+        for k in (None, [3], 'three', 0, -2):
+            r = client.post('/api/recommend', json=dict(features, k=k))
+            out.append([r.status_code, r.get_json()])
+        print(json.dumps(out))
+    """)
+    for status, body in responses:
+        assert status == 400
+        assert body == {'error': 'k must be a positive integer.'}
+
+
+def test_ai_dashboard_shows_prices_on_a_fresh_database(tmp_path):
+    page = run_app(tmp_path, """
+        client.post('/register-user', data={'name': 'Farmer', 'email': 'farmer@example.com', 'password': 'pw',
+                                            'location': '11.0,78.0', 'soil_type': 'Loamy', 'land_size': '2',
+                                            'water_source': 'Well', 'preferred_crops': 'Rice'})
+        client.post('/login', data={'email': 'farmer@example.com', 'password': 'pw'})
+        r = client.get('/ai_dashboard')
+        print(json.dumps([r.status_code, r.get_data(as_text=True)]))
+    """)
+    status, html = page
+    assert status == 200
+    for commodity in ('Maize', 'Rice', 'Wheat'):
+        assert f"<td>{commodity}</td>" in html
@@ -0,0 +1,141 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import http_client as http_client_module
+from http_client import CircuitBreaker, CircuitOpen, HttpClient, UpstreamError
+
+
+class Stub:
+    # Local upstream answering from a script of (status, payload) pairs; the last one repeats
+    def __init__(self):
+        self.script = [(200, {'ok': True})]
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                status, payload = stub.script[min(stub.hits, len(stub.script)) - 1]
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/data"
+
+
+@pytest.fixture
+def stub():
+    stub = Stub()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Record backoff sleeps instead of waiting them out
+    recorded = []
+    monkeypatch.setattr(http_client_module.time, 'sleep', recorded.append)
+    monkeypatch.setattr(http_client_module.random, 'uniform', lambda a, b: 1.0)
+    return recorded
+
+
+def test_retries_with_exponential_backoff(stub, sleeps):
+    stub.script = [(503, {}), (503, {}), (200, {'value': 42})]
+    client = HttpClient(retries=2, backoff=0.2)
+    assert client.get_json(stub.url) == {'value': 42}
+    assert stub.hits == 3
+    assert sleeps == [0.2, 0.4]
+    stats = client.stats()[stub.url.split('/')[2]]
+    assert stats['retries'] == 2 and stats['failures'] == 2 and stats['circuit'] == 'closed'
+
+
+def test_gives_up_after_retries(stub, sleeps):
+    stub.script = [(500, {})]
+    client = HttpClient(retries=1, backoff=0.2)
+    with pytest.raises(UpstreamError):
+        client.get_json(stub.url)
+    assert stub.hits == 2
+
+
+def test_client_errors_are_not_retried(stub, sleeps):
+    stub.script = [(401, {'status': 'error'})]
+    assert HttpClient(retries=2).get_json(stub.url) == {'status': 'error'}
+    assert stub.hits == 1 and sleeps == []
+
+
+def test_breaker_opens_half_opens_and_closes(stub, sleeps):
+    client = HttpClient(retries=0)
+    breaker = client._host(stub.url.split('/')[2]).breaker = CircuitBreaker(threshold=2, reset_after=0.2)
+    stub.script = [(500, {})]
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            client.get_json(stub.url)
+    assert breaker.state == 'open'
+
+    # Open: answered locally, the upstream is not called
+    with pytest.raises(CircuitOpen):
+        client.get_json(stub.url)
+    assert stub.hits == 2
+
+    # Half-open: a failing trial re-opens the circuit
+    breaker.opened_at -= 0.2
+    assert breaker.state == 'half-open'
+    with pytest.raises(UpstreamError):
+        client.get_json(stub.url)
+    assert breaker.state == 'open' and stub.hits == 3
+
+    # Half-open again: a successful trial closes it
+    breaker.opened_at -= 0.2
+    stub.script = [(200, {'value': 1})]
+    stub.hits = 0
+    assert client.get_json(stub.url) == {'value': 1}
+    assert breaker.state == 'closed'
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(threshold=1, reset_after=0.0)
+    breaker.failure()
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+
+def test_falls_back_to_last_good_response(stub, sleeps):
+    client = HttpClient(retries=1)
+    stub.script = [(200, {'temp': 30})]
+    assert client.get_json(stub.url, params={'q': 'x'}) == {'temp': 30}
+
+    stub.script = [(503, {})]
+    stub.hits = 0
+    assert client.get_json(stub.url, params={'q': 'x'}) == {'temp': 30}
+    assert client.stats()[stub.url.split('/')[2]]['fallbacks'] == 1
+
+    # Only the same request falls back
+    with pytest.raises(UpstreamError):
+        client.get_json(stub.url, params={'q': 'y'})
+
+
+def test_weather_provider_uses_host_timeouts(stub, monkeypatch):
+    from weather_provider import WeatherProvider
+    seen = []
+    original = http_client_module.http_client.session.get
+
+    def get(url, **kwargs):
+        seen.append(kwargs['timeout'])
+        return original(url, **kwargs)
+
+    monkeypatch.setattr(http_client_module.http_client.session, 'get', get)
+    monkeypatch.setitem(http_client_module.http_client.host_timeouts, '127.0.0.1', (1.5, 2.5))
+    stub.script = [(200, {'main': {'temp': 25, 'humidity': 60}})]
+    provider = WeatherProvider(base_url=stub.url.rsplit('/', 1)[0])
+    assert provider.current(11.0, 78.0)['main']['temp'] == 25
+    assert seen == [(1.5, 2.5)]
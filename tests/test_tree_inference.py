@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+import training
+from training import MODEL_SPECS, frame, load_features, make_estimator
+from tree_inference import PARITY_DATA, CompiledForest, check_parity
+
+# Compiled forests must match sklearn on every training row. Forests are fitted here from
+# the training CSVs so the check does not depend on the pickled models' sklearn version.
+
+pytestmark = pytest.mark.filterwarnings('ignore:X does not have valid feature names')
+
+
+@pytest.fixture(autouse=True)
+def feature_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(training, 'FEATURE_CACHE_DIR', str(tmp_path / 'features'))
+
+
+def fit(name, family):
+    spec = MODEL_SPECS[name]
+    X, y = load_features(name, spec)
+    model = make_estimator(family, spec['kind'], {'n_estimators': 25})
+    model.fit(frame(spec, X), y)
+    return model, X
+
+
+@pytest.mark.parametrize('family', ['random_forest', 'extra_trees'])
+@pytest.mark.parametrize('name', list(PARITY_DATA))
+def test_compiled_forest_matches_sklearn(name, family):
+    assert PARITY_DATA[name][1] == MODEL_SPECS[name]['features']
+    model, X = fit(name, family)
+    compiled = CompiledForest.from_sklearn(model)
+    assert check_parity(model, compiled, X) == []
+
+
+@pytest.mark.parametrize('name', list(PARITY_DATA))
+def test_saved_forest_matches_sklearn(name, tmp_path):
+    model, X = fit(name, 'random_forest')
+    CompiledForest.from_sklearn(model).save(str(tmp_path / name))
+    compiled = CompiledForest.load(str(tmp_path / name))
+    assert check_parity(model, compiled, X) == []
+    if compiled.kind == 'classifier':
+        assert compiled.predict_one(X[0]) == model.predict(X[:1])[0]
+    else:
+        assert np.isclose(compiled.predict_one(X[0]), model.predict(X[:1])[0])
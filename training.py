@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import (ExtraTreesClassifier, ExtraTreesRegressor, HistGradientBoostingClassifier,
+                              HistGradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor)
+from sklearn.metrics import accuracy_score, mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from datasets import DATASETS, load, source_version
+from model_registry import registry
+
+ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR', 'ml_models/artifacts')
+FEATURE_CACHE_DIR = os.path.join(ARTIFACT_DIR, 'features')
+SEED = 42
+TEST_SIZE = 0.2
+MIN_HOLDOUT_ROWS = 20   # smaller datasets are scored on their training rows
+
+# One spec per registry model. Feature order is the order the app passes at inference time.
+MODEL_SPECS = {
+    'crop': {
+        'dataset': 'crop_recommendation',
+        'features': ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'],
+        'target': 'label',
+        'kind': 'classifier',
+        'params': {'n_estimators': 100},
+    },
+    'soil_health': {
+        'dataset': 'soil_health',
+        'features': ['pH', 'moisture', 'N', 'K', 'P'],
+        'target': 'soil_health',
+        'kind': 'regressor',
+        'params': {'n_estimators': 100},
+    },
+    'revenue': {
+        'dataset': 'revenue',
+        'features': ['acres', 'active_crops', 'soil_health', 'other_feature'],
+        'target': 'monthly_revenue',
+        'kind': 'regressor',
+        'params': {'n_estimators': 100},
+    },
+}
+
+ESTIMATORS = {
+    'random_forest': {'classifier': RandomForestClassifier, 'regressor': RandomForestRegressor},
+    'extra_trees': {'classifier': ExtraTreesClassifier, 'regressor': ExtraTreesRegressor},
+    'hist_gradient_boosting': {'classifier': HistGradientBoostingClassifier, 'regressor': HistGradientBoostingRegressor},
+}
+
+# Other spellings seen in the training data (the old soil-health script used the long names)
+COLUMN_ALIASES = {'ph': 'pH', 'nitrogen': 'N', 'potassium': 'K', 'phosphorus': 'P'}
+
+
+def feature_key(spec):
+    # Changes when the dataset file or the feature/target selection changes
+    path = DATASETS[spec['dataset']]['path']
+    raw = json.dumps([source_version(path), spec['features'], spec['target']])
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def load_features(name, spec):
+    # (X, y) for a model, cached as .npz per dataset version
+    cache_path = os.path.join(FEATURE_CACHE_DIR, f"{name}-{feature_key(spec)}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as data:
+            return data['X'], data['y']
+
+    df = load(spec['dataset'])
+    wanted = spec['features'] + [spec['target']]
+    df = df.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if v in wanted and v not in df.columns})
+    missing = [c for c in wanted if c not in df.columns]
+    if missing:
+        raise ValueError(f"{spec['dataset']} is missing columns: {', '.join(missing)}")
+    X = df[spec['features']].to_numpy(dtype=np.float64)
+    y = np.asarray(df[spec['target']]).astype(str if spec['kind'] == 'classifier' else np.float64)
+
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, X=X, y=y)
+    os.replace(tmp_path, cache_path)
+    return X, y
+
+
+def evaluate(model, kind, X, y):
+    predicted = model.predict(X)
+    if kind == 'classifier':
+        return {'accuracy': round(float(accuracy_score(y, predicted)), 4)}
+    metrics = {'mae': round(float(mean_absolute_error(y, predicted)), 4)}
+    if len(y) > 1:
+        metrics['r2'] = round(float(r2_score(y, predicted)), 4)
+    return metrics
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def train_one(name, n_jobs=1, seed=SEED):
+    # Runs in a worker process; returns the artifact's metadata
+    spec = MODEL_SPECS[name]
+    started = time.perf_counter()
+    X, y = load_features(name, spec)
+    prepared = time.perf_counter()
+
+    if len(X) >= MIN_HOLDOUT_ROWS:
+        stratify = y if spec['kind'] == 'classifier' else None
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=seed, stratify=stratify)
+        evaluated_on = 'holdout'
+    else:
+        X_train, X_test, y_train, y_test = X, X, y, y
+        evaluated_on = 'train'
+
+    family, params = model_config(name)
+    model = make_estimator(family, spec['kind'], params, seed, n_jobs)
+    model.fit(frame(spec, X_train), y_train)
+    fitted = time.perf_counter()
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=None)   # inference in the app is single-row; don't carry the pool size
+
+    return save_artifact(name, model, {
+        'family': family,
+        'params': dict(params, random_state=seed),
+        'rows': len(X),
+        'evaluated_on': evaluated_on,
+        'metrics': evaluate(model, spec['kind'], frame(spec, X_test), y_test),
+        'seconds': {'features': round(prepared - started, 3), 'fit': round(fitted - prepared, 3),
+                    'total': round(time.perf_counter() - started, 3)},
+        'n_jobs': n_jobs,
+    })
+
+
+def frame(spec, X):
+    # Fit and score with column names, as the app predicts from DataFrames
+    return pd.DataFrame(X, columns=spec['features'])
+
+
+def make_estimator(family, kind, params, seed=SEED, n_jobs=None):
+    estimator = ESTIMATORS[family][kind]
+    if 'n_jobs' in estimator().get_params():
+        params = dict(params, n_jobs=n_jobs)
+    return estimator(random_state=seed, **params)
+
+
+def model_config(name):
+    # (family, params): the spec's defaults unless model_selection.py picked something else
+    spec = MODEL_SPECS[name]
+    try:
+        with open(os.path.join(ARTIFACT_DIR, name, 'selected.json')) as f:
+            selected = json.load(f)
+        return selected['family'], selected['params']
+    except (OSError, ValueError, KeyError):
+        return spec.get('family', 'random_forest'), spec['params']
+
+
+def save_artifact(name, model, details):
+    # ml_models/artifacts/<name>/<timestamp>-<hash>/{model.joblib, metrics.json}
+    spec = MODEL_SPECS[name]
+    dataset_path = DATASETS[spec['dataset']]['path']
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    tmp_dir = os.path.join(ARTIFACT_DIR, name, f".{stamp}.{os.getpid()}.tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(tmp_dir, 'model.joblib'))
+    content_hash = file_sha256(os.path.join(tmp_dir, 'model.joblib'))
+    version = f"{stamp}-{content_hash[:12]}"
+    meta = dict({
+        'model': name,
+        'version': version,
+        'content_hash': content_hash,
+        'artifact_bytes': os.path.getsize(os.path.join(tmp_dir, 'model.joblib')),
+        'dataset': dataset_path,
+        'dataset_version': source_version(dataset_path),
+        'features': spec['features'],
+        'target': spec['target'],
+        'sklearn': sklearn.__version__,
+        'numpy': np.__version__,
+    }, **details)
+    with open(os.path.join(tmp_dir, 'metrics.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    target = os.path.join(ARTIFACT_DIR, name, version)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    meta['path'] = target
+    return meta
+
+
+def publish(meta):
+    # Swap the new model in at the path the registry loads from; the registry sees the
+    # new mtime/size and reloads it, and the .joblib/.forest siblings are rebuilt
+    path = registry.path(meta['model'])
+    model = joblib.load(os.path.join(meta['path'], 'model.joblib'))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if path.endswith('.pkl'):
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(model, f)
+    else:
+        joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def train_all(names=None, workers=None, seed=SEED, publish_models=True):
+    # Models train in parallel processes; the cores are split between them for the forests
+    names = list(names or MODEL_SPECS)
+    cpus = os.cpu_count() or 1
+    workers = workers or min(len(names), cpus)
+    n_jobs = max(1, cpus // workers)
+
+    started = time.perf_counter()
+    results, failures = [], {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(train_one, name, n_jobs, seed) for name in names}
+        for name, future in futures.items():
+            try:
+                meta = future.result()
+            except Exception as e:
+                failures[name] = str(e)
+                continue
+            if publish_models:
+                meta['published_to'] = publish(meta)
+            results.append(meta)
+
+    report = {'finished_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+              'seconds': round(time.perf_counter() - started, 3), 'workers': workers,
+              'n_jobs_per_model': n_jobs, 'models': results, 'failures': failures}
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    with open(os.path.join(ARTIFACT_DIR, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report):
+    print(f"{'model':<12} {'rows':>6} {'fit s':>7} {'total s':>8}  metrics")
+    for meta in report['models']:
+        metrics = ', '.join(f"{k}={v}" for k, v in meta['metrics'].items())
+        print(f"{meta['model']:<12} {meta['rows']:>6} {meta['seconds']['fit']:>7} {meta['seconds']['total']:>8}  "
+              f"{metrics} ({meta['evaluated_on']}) -> {meta['version']}")
+    for name, error in report['failures'].items():
+        print(f"{name:<12} failed: {error}")
+    print(f"{len(report['models'])} models in {report['seconds']}s "
+          f"({report['workers']} processes x {report['n_jobs_per_model']} cores)")
+
+
+if __name__ == "__main__":
+    # python training.py [model ...] [--no-publish]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    unknown = set(args) - set(MODEL_SPECS)
+    if unknown:
+        sys.exit(f"Unknown models: {', '.join(sorted(unknown))} (choose from {', '.join(MODEL_SPECS)})")
+    report = train_all(args or None, publish_models='--no-publish' not in sys.argv)
+    print_report(report)
+    sys.exit(1 if report['failures'] else 0)
@@ -0,0 +1,175 @@
+import json
+import os
+import sys
+import numpy as np
+
+TABLES = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+
+class CompiledForest:
+    # A RandomForestRegressor/Classifier flattened into one set of node arrays.
+    # Leaves point to themselves, so evaluation is max_depth rounds of gathers
+    # across every tree (and every row) at once, with no sklearn validation overhead.
+    def __init__(self, tables, meta):
+        self.feature = tables['feature']      # int32, split feature (0 at leaves)
+        self.threshold = tables['threshold']  # float64, +inf at leaves
+        self.left = tables['left']            # int32, global node index
+        self.right = tables['right']
+        self.value = tables['value']          # (nodes,) for regressors, (nodes, classes) probabilities
+        self.roots = tables['roots']          # int32, root node of each tree
+        self.meta = meta
+        self.kind = meta['kind']
+        self.max_depth = meta['max_depth']
+        self.n_features = meta['n_features']
+        self.feature_names_in_ = meta.get('feature_names')
+        if self.kind == 'classifier':
+            self.classes_ = np.array(meta['classes'])
+
+    @classmethod
+    def from_sklearn(cls, model):
+        trees = [est.tree_ for est in model.estimators_]
+        if trees[0].n_outputs != 1:
+            raise ValueError("Multi-output forests are not supported.")
+        kind = 'classifier' if hasattr(model, 'classes_') else 'regressor'
+
+        sizes = np.array([t.node_count for t in trees])
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        feature, threshold, left, right, value = [], [], [], [], []
+        for root, t in zip(roots, trees):
+            leaf = t.children_left == -1
+            own = np.arange(t.node_count) + root
+            feature.append(np.where(leaf, 0, t.feature))
+            threshold.append(np.where(leaf, np.inf, t.threshold))
+            left.append(np.where(leaf, own, t.children_left + root))
+            right.append(np.where(leaf, own, t.children_right + root))
+            if kind == 'classifier':
+                counts = t.value[:, 0, :]
+                totals = counts.sum(axis=1, keepdims=True)
+                value.append(counts / np.where(totals == 0, 1, totals))
+            else:
+                value.append(t.value[:, 0, 0])
+
+        tables = {
+            'feature': np.concatenate(feature).astype(np.int32),
+            'threshold': np.concatenate(threshold).astype(np.float64),
+            'left': np.concatenate(left).astype(np.int32),
+            'right': np.concatenate(right).astype(np.int32),
+            'value': np.concatenate(value).astype(np.float64),
+            'roots': roots,
+        }
+        meta = {
+            'kind': kind,
+            'max_depth': int(max(t.max_depth for t in trees)),
+            'n_features': int(model.n_features_in_),
+            'feature_names': [str(f) for f in getattr(model, 'feature_names_in_', [])] or None,
+        }
+        if kind == 'classifier':
+            meta['classes'] = model.classes_.tolist()
+        return cls(tables, meta)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in TABLES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        # Memory-mapped, so forked workers share the same pages
+        tables = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in TABLES}
+        with open(os.path.join(path, 'meta.json')) as f:
+            return cls(tables, json.load(f))
+
+    def _check(self, X):
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.shape[-1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[-1]}.")
+        return X
+
+    def leaves_one(self, x):
+        # Fast path for a single row: one gather per level across all trees
+        idx = self.roots
+        for _ in range(self.max_depth):
+            idx = np.where(x[self.feature[idx]] <= self.threshold[idx], self.left[idx], self.right[idx])
+        return idx
+
+    def leaves(self, X):
+        rows = np.arange(len(X))[:, None]
+        idx = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            idx = np.where(X[rows, self.feature[idx]] <= self.threshold[idx], self.left[idx], self.right[idx])
+        return idx
+
+    def _evaluate(self, X):
+        X = self._check(X)
+        if X.ndim == 1:
+            return self.value[self.leaves_one(X)].mean(axis=0)
+        return self.value[self.leaves(X)].mean(axis=1)
+
+    def predict_one(self, x):
+        out = self._evaluate(np.asarray(x).ravel())
+        return self.classes_[np.argmax(out)] if self.kind == 'classifier' else float(out)
+
+    def predict(self, X):
+        X = np.atleast_2d(np.asarray(X))
+        out = self._evaluate(X[0]).reshape(1, -1) if len(X) == 1 else self._evaluate(X)
+        if self.kind == 'classifier':
+            return self.classes_[np.argmax(out, axis=1)]
+        return out.ravel()
+
+    def predict_proba(self, X):
+        if self.kind != 'classifier':
+            raise AttributeError("predict_proba is only available for classifiers.")
+        X = np.atleast_2d(np.asarray(X))
+        return self._evaluate(X[0]).reshape(1, -1) if len(X) == 1 else self._evaluate(X)
+
+
+# Parity checks against sklearn on the training data: (registry name, dataset, feature columns)
+PARITY_DATA = {
+    'soil_health': ('soil_health', ['pH', 'moisture', 'N', 'K', 'P']),
+    'revenue': ('revenue', ['acres', 'active_crops', 'soil_health', 'other_feature']),
+    'crop': ('crop_recommendation', ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']),
+}
+
+
+def check_parity(model, compiled, X, rtol=1e-9, atol=1e-9):
+    X = np.asarray(X, dtype=np.float64)
+    problems = []
+    if compiled.kind == 'classifier':
+        expected, got = model.predict_proba(X), compiled.predict_proba(X)
+        if not (model.predict(X) == compiled.predict(X)).all():
+            problems.append("predicted labels differ")
+    else:
+        expected, got = model.predict(X), compiled.predict(X)
+    if not np.allclose(expected, got, rtol=rtol, atol=atol):
+        problems.append(f"max abs difference {np.max(np.abs(expected - got)):.3g}")
+    single = [compiled.predict(row.reshape(1, -1))[0] for row in X[:50]]
+    if not np.array_equal(np.array(single), compiled.predict(X[:50])):
+        problems.append("single-row path differs from batched path")
+    return problems
+
+
+if __name__ == "__main__":
+    # python tree_inference.py [model ...] — compile the registered forests and check them against sklearn
+    import warnings
+    from datasets import load as load_dataset
+    from model_registry import registry
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    failed = False
+    for name in sys.argv[1:] or PARITY_DATA:
+        dataset, columns = PARITY_DATA[name]
+        try:
+            model = registry.get(name)
+        except Exception as e:
+            print(f"⚠️ {name}: skipped, model could not be loaded ({e})")
+            continue
+        compiled = CompiledForest.from_sklearn(model)
+        X = load_dataset(dataset)[columns].to_numpy(dtype=np.float64)
+        problems = check_parity(model, compiled, X)
+        failed = failed or bool(problems)
+        print(f"{'❌' if problems else '✅'} {name}: {len(X)} rows, {len(compiled.roots)} trees"
+              + (f" — {'; '.join(problems)}" if problems else ""))
+    sys.exit(1 if failed else 0)
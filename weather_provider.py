@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from fanout import remaining
+from http_client import http_client
+
+# OpenWeatherMap "current weather" settings (override the base URL to point at a local stub)
+OPENWEATHER_BASE_URL = os.environ.get('OPENWEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5')
+OPENWEATHER_API_KEY = os.environ.get('OPENWEATHER_API_KEY', '63f6d64abf2532c74319740224e1fc24')
+
+WEATHER_TTL = float(os.environ.get('WEATHER_TTL', 600))              # fresh for 10 minutes
+WEATHER_STALE_TTL = float(os.environ.get('WEATHER_STALE_TTL', 3600))  # then served stale while refreshing
+COORD_PRECISION = 2      # ~1 km grid, so farms in the same village share one entry
+MAX_ENTRIES = 10000
+
+
+class _Flight:
+    # One upstream call that concurrent misses for the same key wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = {}
+
+
+class WeatherProvider:
+    def __init__(self, base_url=OPENWEATHER_BASE_URL, api_key=OPENWEATHER_API_KEY,
+                 ttl=WEATHER_TTL, stale_ttl=WEATHER_STALE_TTL,
+                 precision=COORD_PRECISION, max_entries=MAX_ENTRIES):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.precision = precision
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._entries = {}   # (lat, lon) -> (data, fetched_at)
+        self._flights = {}   # (lat, lon) -> _Flight
+        self._lock = threading.Lock()
+
+    def key(self, lat, lon):
+        return (round(float(lat), self.precision), round(float(lon), self.precision))
+
+    def fetch(self, lat, lon):
+        # Raw upstream call, no caching
+        params = {'lat': lat, 'lon': lon, 'appid': self.api_key, 'units': 'metric'}
+        # Timeouts come from http_client's per-host table
+        return http_client.get_json(f"{self.base_url}/weather", params=params)
+
+    def current(self, lat, lon):
+        key = self.key(lat, lon)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                data, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.hits += 1
+                    return data
+                if age < self.ttl + self.stale_ttl:
+                    # Stale-while-revalidate: answer now, refresh in the background
+                    self.stale_hits += 1
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        threading.Thread(target=self._refresh, args=(key, flight), daemon=True).start()
+                    return data
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self._refresh(key, flight)
+        else:
+            # Never wait past the deadline of the gather() this lookup runs under
+            read_timeout = http_client.timeout_for(self.base_url)[1]
+            flight.done.wait(remaining(read_timeout * (http_client.retries + 2)))
+        return flight.result
+
+    def _refresh(self, key, flight):
+        try:
+            data = self.fetch(*key)
+        except Exception as e:
+            print("Weather fetch failed:", e)
+            data = {}
+
+        with self._lock:
+            # Only cache real observations; error payloads (bad key, rate limit) are retried next time
+            if 'main' in data:
+                self._entries.pop(key, None)
+                self._entries[key] = (data, time.monotonic())
+                while len(self._entries) > self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                flight.result = data
+            else:
+                entry = self._entries.get(key)
+                flight.result = entry[0] if entry else data
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def invalidate(self, lat=None, lon=None):
+        with self._lock:
+            if lat is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.key(lat, lon), None)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits,
+                    'stale_hits': self.stale_hits, 'misses': self.misses}
+
+
+# Shared provider used by every route in app.py
+weather_provider = WeatherProvider()
+
+
+def get_current_weather(lat, lon):
+    return weather_provider.current(lat, lon)